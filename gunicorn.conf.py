@@ -0,0 +1,24 @@
+"""Gunicorn configuration for running the API with preloaded uvicorn workers.
+
+Usage:
+    PRELOAD_EMBEDDING_MODEL=1 gunicorn disney_customers_feedback_ex.main:app
+"""
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+# One worker per CPU, as when running main.py directly: every worker holds its
+# own cache similarity index, LLM/embedding caches and ChromaDB connection pool
+workers = int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+# Workers inherit this, and each caps its torch threads at cpu_count // workers
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# Import the app once in the master before forking. With
+# PRELOAD_EMBEDDING_MODEL=1 the embedding model weights are loaded there and
+# shared copy-on-write by all workers instead of being loaded once per worker.
+# CPU only: CUDA can't be used in forked workers, so on a CUDA host the
+# setting is ignored and each worker loads the model itself.
+preload_app = True
+
+# Model warm-up and service connections run in each worker's lifespan
+timeout = 120
@@ -2,33 +2,81 @@
 from __future__ import annotations
 
 import logging
+import threading
 import time
-from enum import Enum
+from enum import StrEnum
 from typing import Callable, Any
 
 logger = logging.getLogger(__name__)
 
+_monotonic_ns = time.monotonic_ns
 
-class CircuitState(Enum):
-    """Circuit breaker states."""
+
+class CircuitState(StrEnum):
+    """Circuit breaker states.
+    
+    Members are singletons, so the hot path compares them by identity (``is``)
+    rather than going through ``Enum.__eq__``.
+    """
     CLOSED = "closed"      # Normal operation
     OPEN = "open"          # Failing, reject requests
     HALF_OPEN = "half_open"  # Testing if service recovered
 
 
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open.
+    
+    Only the breaker name is stored; the message is built when formatted.
+    """
+    
+    __slots__ = ("name",)
+    
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.name = name
+    
+    def __str__(self) -> str:
+        return f"Circuit breaker {self.name} is OPEN"
+
+
 class CircuitBreaker:
     """Circuit breaker to prevent cascading failures.
     
     Tracks failure rate and opens circuit when threshold is exceeded.
     Automatically attempts to close after timeout period.
+    
+    Counter updates and state transitions happen under a single lock so
+    concurrent callers cannot lose counts or race through the same transition.
     """
     
+    __slots__ = (
+        "name",
+        "failure_threshold",
+        "timeout",
+        "window_size",
+        "minimum_throughput",
+        "state",
+        "failures",
+        "successes",
+        "last_failure_time_ns",
+        "last_state_change_ns",
+        "last_state_change_time",
+        "_timeout_ns",
+        "_lock",
+        "_half_open_in_flight",
+        "_open_error",
+        "_window",
+        "_window_mask",
+        "_samples",
+    )
+    
     def __init__(
         self,
         name: str,
         failure_threshold: float = 0.5,
         timeout: float = 60.0,
-        window_size: int = 10
+        window_size: int = 10,
+        minimum_throughput: int = 5
     ) -> None:
         """Initialize circuit breaker.
         
@@ -37,17 +85,77 @@ class CircuitBreaker:
             failure_threshold: Failure rate to trigger circuit open (0.0-1.0).
             timeout: Seconds to wait before attempting half-open state.
             window_size: Number of recent calls to track.
+            minimum_throughput: Calls that must be recorded in the window before
+                the failure rate is allowed to open the circuit.
         """
         self.name = name
         self.failure_threshold = failure_threshold
         self.timeout = timeout
         self.window_size = window_size
+        self.minimum_throughput = min(minimum_throughput, window_size)
+        self._timeout_ns = int(timeout * 1e9)
         
         self.state = CircuitState.CLOSED
         self.failures = 0
         self.successes = 0
-        self.last_failure_time: float | None = None
-        self.last_state_change: float = time.time()
+        # Monotonic nanoseconds: immune to wall-clock adjustments
+        self.last_failure_time_ns: int | None = None
+        self.last_state_change_ns: int = _monotonic_ns()
+        # Wall-clock (epoch seconds) time of the same change, for reporting
+        self.last_state_change_time: float = time.time()
+        
+        self._lock = threading.Lock()
+        self._half_open_in_flight = False
+        # Rejections are raised from a single pre-built instance
+        self._open_error = CircuitOpenError(name)
+        
+        # Sliding window of the last `window_size` outcomes, one bit per call
+        # (1 = failure), newest in the lowest bit
+        self._window = 0
+        self._window_mask = (1 << window_size) - 1
+        self._samples = 0
+    
+    def _record_outcome(self, failed: int) -> None:
+        """Push an outcome into the sliding window and refresh the counters.
+        
+        Must be called with ``self._lock`` held.
+        
+        Args:
+            failed: 1 if the call failed, 0 if it succeeded.
+        """
+        self._window = ((self._window << 1) | failed) & self._window_mask
+        if self._samples < self.window_size:
+            self._samples += 1
+        self.failures = self._window.bit_count()
+        self.successes = self._samples - self.failures
+    
+    def _mark_state_change(self) -> None:
+        """Timestamp a state transition. Must be called with ``self._lock`` held."""
+        self.last_state_change_ns = _monotonic_ns()
+        self.last_state_change_time = time.time()
+    
+    def _try_start_probe(self) -> bool:
+        """Claim the single HALF_OPEN probe slot.
+        
+        Transitions OPEN to HALF_OPEN once the timeout has elapsed. Only one
+        caller may probe the recovering service at a time; everyone else keeps
+        getting rejected until the probe finishes.
+        
+        Returns:
+            True if this caller owns the probe and should execute the call.
+        """
+        with self._lock:
+            if self._half_open_in_flight:
+                return False
+            if self.state is CircuitState.OPEN:
+                if not self._should_attempt_reset():
+                    return False
+                self.state = CircuitState.HALF_OPEN
+                self._mark_state_change()
+            elif self.state is not CircuitState.HALF_OPEN:
+                return False
+            self._half_open_in_flight = True
+            return True
     
     def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
         """Execute function with circuit breaker protection.
@@ -61,67 +169,95 @@ class CircuitBreaker:
             Result of function call.
             
         Raises:
-            Exception: If circuit is open or function fails.
+            CircuitOpenError: If circuit is open.
+            Exception: If the function fails.
         """
         # Check if we should transition from OPEN to HALF_OPEN
-        if self.state == CircuitState.OPEN:
-            if self._should_attempt_reset():
-                logger.info(f"Circuit breaker {self.name}: Attempting reset (HALF_OPEN)")
-                self.state = CircuitState.HALF_OPEN
-                self.last_state_change = time.time()
-            else:
+        probe = False
+        if self.state is not CircuitState.CLOSED:
+            probe = self._try_start_probe()
+            if probe:
+                logger.info("Circuit breaker %s: Attempting reset (HALF_OPEN)", self.name)
+            elif self.state is not CircuitState.CLOSED:
                 logger.warning(
-                    f"Circuit breaker {self.name}: Circuit OPEN, rejecting call"
+                    "Circuit breaker %s: Circuit OPEN, rejecting call", self.name
                 )
-                raise Exception(f"Circuit breaker {self.name} is OPEN")
+                raise self._open_error.with_traceback(None) from None
         
         try:
             # Execute the function
             result = func(*args, **kwargs)
-            self._on_success()
-            return result
-            
         except Exception as e:
-            self._on_failure()
+            self._on_failure(probe)
             raise e
+        except BaseException:
+            # Cancellation or interpreter shutdown says nothing about the
+            # service's health; just free the probe slot for the next caller
+            if probe:
+                self._release_probe()
+            raise
+        
+        self._on_success(probe)
+        return result
     
-    def _on_success(self) -> None:
-        """Handle successful call."""
-        self.successes += 1
+    def _release_probe(self) -> None:
+        """Give up the HALF_OPEN probe slot without recording an outcome."""
+        with self._lock:
+            self._half_open_in_flight = False
+    
+    def _on_success(self, probe: bool = False) -> None:
+        """Handle successful call.
         
-        # Reset window if needed
-        if self.successes + self.failures > self.window_size:
-            self._reset_window()
+        Args:
+            probe: Whether the call was the HALF_OPEN probe.
+        """
+        with self._lock:
+            if probe:
+                self._half_open_in_flight = False
+            self._record_outcome(0)
+            
+            # Transition from HALF_OPEN to CLOSED on success
+            recovered = self.state is CircuitState.HALF_OPEN
+            if recovered:
+                self.state = CircuitState.CLOSED
+                # Forget past failures but keep the recorded call volume
+                self._window = 0
+                self.failures = 0
+                self.successes = self._samples
+                self._mark_state_change()
         
-        # Transition from HALF_OPEN to CLOSED on success
-        if self.state == CircuitState.HALF_OPEN:
-            logger.info(f"Circuit breaker {self.name}: Service recovered (CLOSED)")
-            self.state = CircuitState.CLOSED
-            self.failures = 0
-            self.last_state_change = time.time()
+        if recovered:
+            logger.info("Circuit breaker %s: Service recovered (CLOSED)", self.name)
     
-    def _on_failure(self) -> None:
-        """Handle failed call."""
-        self.failures += 1
-        self.last_failure_time = time.time()
+    def _on_failure(self, probe: bool = False) -> None:
+        """Handle failed call.
         
-        # Reset window if needed
-        if self.successes + self.failures > self.window_size:
-            self._reset_window()
-        
-        # Check if we should open the circuit
-        total_calls = self.successes + self.failures
-        if total_calls > 0:
-            failure_rate = self.failures / total_calls
+        Args:
+            probe: Whether the call was the HALF_OPEN probe.
+        """
+        with self._lock:
+            if probe:
+                self._half_open_in_flight = False
+            self._record_outcome(1)
+            self.last_failure_time_ns = _monotonic_ns()
             
-            if failure_rate >= self.failure_threshold:
-                if self.state != CircuitState.OPEN:
-                    logger.error(
-                        f"Circuit breaker {self.name}: Opening circuit "
-                        f"(failure rate: {failure_rate:.2%})"
-                    )
-                    self.state = CircuitState.OPEN
-                    self.last_state_change = time.time()
+            # Check if we should open the circuit once enough calls were seen
+            failure_rate = self.failures / self._samples
+            opened = (
+                self._samples >= self.minimum_throughput
+                and failure_rate >= self.failure_threshold
+                and self.state is not CircuitState.OPEN
+            )
+            if opened:
+                self.state = CircuitState.OPEN
+                self._mark_state_change()
+        
+        if opened:
+            logger.error(
+                "Circuit breaker %s: Opening circuit (failure rate: %.2f%%)",
+                self.name,
+                failure_rate * 100
+            )
     
     def _should_attempt_reset(self) -> bool:
         """Check if enough time has passed to attempt reset.
@@ -129,29 +265,24 @@ class CircuitBreaker:
         Returns:
             True if we should attempt to close the circuit.
         """
-        if self.last_failure_time is None:
+        last_failure_time_ns = self.last_failure_time_ns
+        if last_failure_time_ns is None:
             return False
         
-        time_since_failure = time.time() - self.last_failure_time
-        return time_since_failure >= self.timeout
-    
-    def _reset_window(self) -> None:
-        """Reset the sliding window of calls."""
-        # Keep proportions but reset counts
-        total = self.successes + self.failures
-        if total > 0:
-            success_ratio = self.successes / total
-            self.successes = int(self.window_size * success_ratio)
-            self.failures = self.window_size - self.successes
+        return _monotonic_ns() - last_failure_time_ns >= self._timeout_ns
     
     def reset(self) -> None:
         """Manually reset the circuit breaker to CLOSED state."""
-        logger.info(f"Circuit breaker {self.name}: Manual reset")
-        self.state = CircuitState.CLOSED
-        self.failures = 0
-        self.successes = 0
-        self.last_failure_time = None
-        self.last_state_change = time.time()
+        logger.info("Circuit breaker %s: Manual reset", self.name)
+        with self._lock:
+            self.state = CircuitState.CLOSED
+            self.failures = 0
+            self.successes = 0
+            self._window = 0
+            self._samples = 0
+            self.last_failure_time_ns = None
+            self._mark_state_change()
+            self._half_open_in_flight = False
     
     def get_state(self) -> dict[str, Any]:
         """Get current circuit breaker state.
@@ -159,14 +290,20 @@ class CircuitBreaker:
         Returns:
             Dictionary with state information.
         """
-        total_calls = self.successes + self.failures
-        failure_rate = self.failures / total_calls if total_calls > 0 else 0.0
+        with self._lock:
+            state = self.state
+            failures = self.failures
+            successes = self.successes
+            last_state_change_time = self.last_state_change_time
+        
+        total_calls = successes + failures
+        failure_rate = failures / total_calls if total_calls > 0 else 0.0
         
         return {
             "name": self.name,
-            "state": self.state.value,
-            "failures": self.failures,
-            "successes": self.successes,
+            "state": state.value,
+            "failures": failures,
+            "successes": successes,
             "failure_rate": failure_rate,
-            "last_state_change": self.last_state_change
+            "last_state_change": last_state_change_time
         }
@@ -1,16 +1,22 @@
 """Application lifespan management."""
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Callable
 
-from dotenv import load_dotenv
-from fastapi import FastAPI
+import numpy as np
+
+from fastapi import FastAPI, Request
 
 from disney_customers_feedback_ex.core.logging import setup_logging
-from disney_customers_feedback_ex.core.telemetry import setup_telemetry
+from disney_customers_feedback_ex.core.metrics import init_metrics
+from disney_customers_feedback_ex.core.settings import SETTINGS
+from disney_customers_feedback_ex.core.telemetry import setup_telemetry, shutdown_telemetry
 from disney_customers_feedback_ex.services.embedding_service import EmbeddingService
 from disney_customers_feedback_ex.services.llm_service import LLMService
 from disney_customers_feedback_ex.services.review_service import ReviewService
@@ -19,162 +25,333 @@ from disney_customers_feedback_ex.services.cache_service import QueryCacheServic
 
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# Review search bound at startup: (query, branch, location, max_results, query_embedding) -> reviews
+SearchFunction = Callable[..., list[dict[str, Any]]]
+
 
-# Global services
-review_service: ReviewService | None = None
-llm_service: LLMService | None = None
-embedding_service: EmbeddingService | None = None
-vector_store: VectorStore | None = None
-cache_service: QueryCacheService | None = None
+@dataclass(slots=True)
+class Services:
+    """Services created at startup, stored on ``app.state.services``."""
+    review: ReviewService | None = None
+    llm: LLMService | None = None
+    embedding: EmbeddingService | None = None
+    vector_store: VectorStore | None = None
+    cache: QueryCacheService | None = None
+    search_type: str = "keyword"
+    search: SearchFunction | None = None
 
 
-def get_review_service() -> ReviewService:
+def _select_search(
+    review_service: ReviewService,
+    embedding_service: EmbeddingService | None,
+    vector_store: VectorStore | None
+) -> tuple[str, SearchFunction]:
+    """Pick the review search for the services that came up at startup.
+    
+    Args:
+        review_service: Review service to search with.
+        embedding_service: Embedding service, if available.
+        vector_store: Vector store, if available.
+        
+    Returns:
+        Tuple of (search_type, search function). Both functions accept the
+        same keyword arguments; keyword search ignores ``query_embedding``.
+    """
+    if embedding_service and vector_store:
+        return "hybrid", review_service.search_reviews_hybrid
+    
+    def keyword_search(
+        query: str,
+        branch: str | None = None,
+        location: str | None = None,
+        max_results: int = 10,
+        query_embedding: np.ndarray | None = None
+    ) -> list[dict[str, Any]]:
+        return review_service.search_reviews(
+            query=query, branch=branch, location=location, max_results=max_results
+        )
+    
+    return "keyword", keyword_search
+
+
+def _get_services(request: Request) -> Services:
+    """Get the service container of the application handling the request.
+    
+    Args:
+        request: The incoming request.
+        
+    Returns:
+        Services container.
+    """
+    return request.app.state.services
+
+
+def get_review_service(request: Request) -> ReviewService:
     """Get the review service instance.
     
+    Args:
+        request: The incoming request.
+        
     Returns:
         ReviewService instance.
         
     Raises:
         RuntimeError: If service not initialized.
     """
+    review_service = _get_services(request).review
     if review_service is None:
         raise RuntimeError("Review service not initialized")
     return review_service
 
 
-def get_llm_service() -> LLMService:
+def get_llm_service(request: Request) -> LLMService:
     """Get the LLM service instance.
     
+    Args:
+        request: The incoming request.
+        
     Returns:
         LLMService instance.
         
     Raises:
         RuntimeError: If service not initialized.
     """
+    llm_service = _get_services(request).llm
     if llm_service is None:
         raise RuntimeError("LLM service not initialized")
     return llm_service
 
 
-def get_cache_service() -> QueryCacheService | None:
+def get_search(request: Request) -> tuple[str, SearchFunction]:
+    """Get the review search selected at startup.
+    
+    Args:
+        request: The incoming request.
+        
+    Returns:
+        Tuple of (search_type, search function).
+        
+    Raises:
+        RuntimeError: If service not initialized.
+    """
+    services = _get_services(request)
+    if services.search is None:
+        raise RuntimeError("Review service not initialized")
+    return services.search_type, services.search
+
+
+def get_cache_service(request: Request) -> QueryCacheService | None:
     """Get the cache service instance.
     
+    Args:
+        request: The incoming request.
+        
     Returns:
         QueryCacheService instance or None if not initialized.
     """
-    return cache_service
+    return _get_services(request).cache
 
 
-def get_embedding_service() -> EmbeddingService | None:
+def get_embedding_service(request: Request) -> EmbeddingService | None:
     """Get the embedding service instance.
     
+    Args:
+        request: The incoming request.
+        
     Returns:
         EmbeddingService instance or None if not initialized.
     """
-    return embedding_service
+    return _get_services(request).embedding
 
 
-def get_vector_store() -> VectorStore | None:
+def get_vector_store(request: Request) -> VectorStore | None:
     """Get the vector store instance.
     
+    Args:
+        request: The incoming request.
+        
     Returns:
         VectorStore instance or None if not initialized.
     """
-    return vector_store
+    return _get_services(request).vector_store
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan manager.
-    
-    Handles startup and shutdown of all services.
+def _load_embedding_model(service: EmbeddingService) -> None:
+    """Load the embedding model, or warm up the one preloaded at import.
     
     Args:
-        app: FastAPI application instance.
-        
-    Yields:
-        None during application runtime.
+        service: Embedding service to load the model into.
     """
-    global review_service, llm_service, embedding_service, vector_store, cache_service
+    logger.info("🔤 Initializing embedding service...")
+    if service.model is None:
+        service.load_model()
+    else:
+        service.warm_up()
+    logger.info("✅ Embedding service initialized")
+
+
+def _preload_embedding_service() -> EmbeddingService | None:
+    """Load the embedding model at import time if preloading is enabled.
     
-    # ========== STARTUP ==========
-    setup_logging()
-    logger.info("🚀 Disney Customer Feedback API starting up...")
+    With ``gunicorn --preload`` the app is imported once in the master, so the
+    weights loaded here are shared copy-on-write by every forked worker.
+    Preloading is CPU-only: CUDA cannot be re-initialized in forked children,
+    so on a CUDA host each worker loads its own model in the lifespan instead.
     
-    # Setup telemetry
-    setup_telemetry(app, "disney-customer-feedback-api")
-    logger.info("📊 OpenTelemetry instrumentation enabled")
+    Returns:
+        EmbeddingService with a loaded (not yet warmed up) model, or None.
+    """
+    if not SETTINGS.preload_embedding_model:
+        return None
     
-    # Get data path
-    data_path = Path(__file__).parent.parent / "resources" / "DisneylandReviews.csv"
+    # The NVML-based check answers without initializing CUDA in this process
+    os.environ.setdefault("PYTORCH_NVML_BASED_CUDA_CHECK", "1")
+    import torch
+    if torch.cuda.is_available():
+        logger.warning(
+            "PRELOAD_EMBEDDING_MODEL ignored: CUDA is available and cannot be "
+            "used after fork, so each worker loads its own model"
+        )
+        return None
     
-    # Initialize embedding service
-    logger.info("🔤 Initializing embedding service...")
-    embedding_service = EmbeddingService()
-    embedding_service.load_model()
-    logger.info("✅ Embedding service initialized")
+    service = EmbeddingService()
+    service.load_model(warm_up=False)
+    return service
+
+
+_preloaded_embedding_service = _preload_embedding_service()
+
+
+def _connect_cache_service(service: EmbeddingService) -> QueryCacheService | None:
+    """Connect the query cache to Redis.
     
-    # Initialize cache service with Redis
-    redis_host = os.getenv("REDIS_HOST", "localhost")
-    redis_port = int(os.getenv("REDIS_PORT", "6379"))
+    Args:
+        service: Embedding service used by the cache for similarity lookups.
+        
+    Returns:
+        QueryCacheService instance or None if disabled or Redis is unavailable.
+    """
+    if not SETTINGS.enable_cache:
+        logger.info("💾 Cache service disabled (ENABLE_CACHE=0)")
+        return None
     
-    logger.info(f"💾 Initializing cache service with Redis at {redis_host}:{redis_port}...")
+    logger.info(
+        "💾 Initializing cache service with Redis at %s:%s...",
+        SETTINGS.redis_host,
+        SETTINGS.redis_port
+    )
     try:
-        cache_service = QueryCacheService(
-            embedding_service=embedding_service,
-            redis_host=redis_host,
-            redis_port=redis_port,
+        cache = QueryCacheService(
+            embedding_service=service,
+            redis_host=SETTINGS.redis_host,
+            redis_port=SETTINGS.redis_port,
             redis_db=0,
-            similarity_threshold=0.95,
-            ttl_hours=24
+            similarity_threshold=SETTINGS.cache_similarity_threshold,
+            ttl_hours=SETTINGS.cache_ttl_hours
         )
         logger.info("✅ Cache service initialized successfully")
+        return cache
     except Exception as e:
-        logger.warning(f"⚠️ Cache service initialization failed: {str(e)}. Continuing without caching.")
-        cache_service = None
+        logger.warning("⚠️ Cache service initialization failed: %s. Continuing without caching.", e)
+        return None
+
+
+def _connect_vector_store() -> VectorStore | None:
+    """Connect to ChromaDB and create the reviews collection.
+    
+    Returns:
+        VectorStore instance or None if disabled or ChromaDB is unavailable.
+    """
+    if not SETTINGS.enable_vector_store:
+        logger.info("🗄️  Vector store disabled (ENABLE_VECTOR_STORE=0)")
+        return None
     
-    # Initialize vector store
     logger.info("🗄️  Initializing vector store...")
-    vector_store = VectorStore()
+    store = VectorStore()
     try:
-        vector_store.connect()
-        vector_store.create_collection()
+        store.connect()
+        store.create_collection()
         logger.info("✅ Vector store connected and collection created successfully")
+        return store
     except Exception as e:
         logger.warning(
-            f"⚠️ Vector store connection failed: {str(e)}. "
-            "Continuing without semantic search."
+            "⚠️ Vector store connection failed: %s. "
+            "Continuing without semantic search.",
+            e
         )
-        vector_store = None
-        # Don't set embedding_service to None here as cache still needs it
+        return None
+
+
+def _load_reviews(service: ReviewService) -> None:
+    """Load reviews from CSV.
+    
+    Args:
+        service: Review service to load the reviews into.
+    """
+    logger.info("📖 Loading reviews from CSV...")
+    service.load_reviews()
+    num_reviews = len(service.reviews_df) if service.reviews_df is not None else 0
+    logger.info("✅ Review service initialized with %d reviews", num_reviews)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan manager.
+    
+    Handles startup and shutdown of all services.
+    
+    Args:
+        app: FastAPI application instance.
+        
+    Yields:
+        None during application runtime.
+    """
+    # ========== STARTUP ==========
+    setup_logging()
+    logger.info("🚀 Disney Customer Feedback API starting up...")
     
-    # Initialize review service
-    logger.info("Initializing review service...")
+    # Setup telemetry (metric instruments fall back to no-ops when disabled)
+    if SETTINGS.telemetry_enabled:
+        setup_telemetry(app, "disney-customer-feedback-api")
+        logger.info("📊 OpenTelemetry instrumentation enabled")
+    else:
+        logger.info("📊 OpenTelemetry instrumentation disabled")
+    init_metrics()
+    
+    # Get data path
     data_path = Path(__file__).parent.parent / "resources" / "DisneylandReviews.csv"
+    
+    embedding_service = _preloaded_embedding_service or EmbeddingService()
     review_service = ReviewService(
         data_path=data_path,
-        embedding_service=embedding_service,
-        vector_store=vector_store
+        embedding_service=embedding_service
     )
     
-    # Load reviews from CSV
-    logger.info("📖 Loading reviews from CSV...")
-    review_service.load_reviews()
-    num_reviews = len(review_service.reviews_df) if review_service.reviews_df is not None else 0
-    logger.info(f"✅ Review service initialized with {num_reviews} reviews")
+    # Model load, Redis connect, ChromaDB connect and CSV load are independent
+    # blocking steps, so run them concurrently in worker threads
+    _, cache_service, vector_store, _ = await asyncio.gather(
+        asyncio.to_thread(_load_embedding_model, embedding_service),
+        asyncio.to_thread(_connect_cache_service, embedding_service),
+        asyncio.to_thread(_connect_vector_store),
+        asyncio.to_thread(_load_reviews, review_service),
+    )
+    review_service.vector_store = vector_store
     
-    # Index embeddings if vector store is available
+    # Batch concurrent /query embeddings into single model calls
+    embedding_service.start_batching()
+    
+    # Index embeddings if vector store is available (off the event loop: this
+    # embeds the whole corpus on first start)
     if vector_store and embedding_service:
         try:
             logger.info("🔍 Indexing embeddings in vector store...")
-            review_service.index_embeddings()
+            await asyncio.to_thread(review_service.index_embeddings)
             logger.info("✅ Embeddings indexed successfully")
         except Exception as e:
             logger.warning(
-                f"⚠️ Failed to index embeddings: {str(e)}. "
-                "Continuing with keyword search only."
+                "⚠️ Failed to index embeddings: %s. "
+                "Continuing with keyword search only.",
+                e
             )
     
     # Initialize LLM service
@@ -182,6 +359,22 @@ async def lifespan(app: FastAPI):
     llm_service = LLMService()
     logger.info("✅ LLM service initialized")
     
+    search_type, search = _select_search(review_service, embedding_service, vector_store)
+    logger.info("🔎 Using %s review search", search_type)
+    if search_type == "hybrid":
+        # Hybrid scoring needs the keyword index; build it before serving
+        await asyncio.to_thread(review_service.build_keyword_index)
+    
+    app.state.services = Services(
+        review=review_service,
+        llm=llm_service,
+        embedding=embedding_service,
+        vector_store=vector_store,
+        cache=cache_service,
+        search_type=search_type,
+        search=search
+    )
+    
     logger.info("✨ All services initialized successfully! Ready to serve requests.")
     
     yield
@@ -189,6 +382,13 @@ async def lifespan(app: FastAPI):
     # ========== SHUTDOWN ==========
     logger.info("👋 Disney Customer Feedback API shutting down...")
     
+    # Stop the embedding micro-batcher
+    await embedding_service.stop_batching()
+    
+    # Close the LLM HTTP connection pool
+    if llm_service:
+        await llm_service.close()
+    
     # Cleanup vector store connection if needed
     if vector_store:
         logger.info("Closing vector store connection...")
@@ -199,4 +399,7 @@ async def lifespan(app: FastAPI):
         logger.info("Closing cache service connection...")
         # Add any cleanup code here if needed
     
+    # Export spans and metrics still buffered in memory
+    shutdown_telemetry()
+    
     logger.info("✅ Shutdown complete. Goodbye!")
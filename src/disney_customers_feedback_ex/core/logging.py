@@ -2,12 +2,48 @@ from __future__ import annotations
 
 import logging
 import sys
+import time
+
+from disney_customers_feedback_ex.core.settings import SETTINGS
+
+
+class CachedTimeFormatter(logging.Formatter):
+    """Formatter that renders ``asctime`` at most once per second.
+    
+    Records logged within the same second reuse the previously formatted
+    timestamp instead of calling ``localtime``/``strftime`` again.
+    """
+    
+    default_time_format = "%Y-%m-%d %H:%M:%S"
+    
+    def __init__(self, fmt: str | None = None) -> None:
+        super().__init__(fmt)
+        # (second, formatted) swapped as one tuple so threads never see a torn pair
+        self._cached_second: tuple[int, str] = (-1, "")
+    
+    def formatTime(self, record: logging.LogRecord, datefmt: str | None = None) -> str:
+        """Format the record creation time, reusing the cached second.
+        
+        Args:
+            record: The log record.
+            datefmt: Ignored; the default time format is always used.
+            
+        Returns:
+            Timestamp like ``2024-01-31 12:00:00,123``.
+        """
+        second = int(record.created)
+        cached_second, formatted = self._cached_second
+        if second != cached_second:
+            formatted = time.strftime(self.default_time_format, self.converter(second))
+            self._cached_second = (second, formatted)
+        return self.default_msec_format % (formatted, record.msecs)
 
 
 def setup_logging() -> None:
     """Sets up logging for the application.
 
-    Configures the logging level and format, and adds a console handler.
+    Configures the logging level (``LOG_LEVEL``, default ``INFO``) and
+    format, and adds a console handler.
     """
     # Configure the root logger
     root_logger = logging.getLogger()
@@ -15,14 +51,14 @@ def setup_logging() -> None:
     # Clear any existing handlers
     root_logger.handlers.clear()
     
-    root_logger.setLevel(logging.INFO)
+    root_logger.setLevel(SETTINGS.log_level)
 
     # Create console handler
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
+    console_handler.setLevel(SETTINGS.log_level)
 
     # Create formatter and add it to the handler
-    formatter = logging.Formatter(
+    formatter = CachedTimeFormatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     console_handler.setFormatter(formatter)
@@ -2,168 +2,276 @@
 from __future__ import annotations
 
 import time
-from contextlib import contextmanager
-from typing import Generator
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping
 
 from opentelemetry import metrics
 
 from disney_customers_feedback_ex.core.telemetry import get_meter
 
-# Get meter for custom metrics
-meter = get_meter(__name__)
-
-# Request metrics
-request_duration = meter.create_histogram(
-    name="disney_api_request_duration_seconds",
-    description="Request duration in seconds",
-    unit="s"
-)
-
-request_count = meter.create_counter(
-    name="disney_api_request_count",
-    description="Total number of API requests",
-    unit="1"
-)
-
-error_count = meter.create_counter(
-    name="disney_api_error_count",
-    description="Total number of errors",
-    unit="1"
-)
-
-# Search metrics
-search_type_count = meter.create_counter(
-    name="disney_api_search_type_count",
-    description="Count of searches by type (keyword/hybrid)",
-    unit="1"
-)
-
-reviews_returned = meter.create_histogram(
-    name="disney_api_reviews_returned",
-    description="Number of reviews returned per query",
-    unit="1"
-)
-
-# Component latency metrics
-chromadb_search_duration = meter.create_histogram(
-    name="disney_api_chromadb_search_duration_seconds",
-    description="ChromaDB vector search duration",
-    unit="s"
-)
-
-embedding_generation_duration = meter.create_histogram(
-    name="disney_api_embedding_generation_duration_seconds",
-    description="Embedding generation duration",
-    unit="s"
-)
-
-llm_inference_duration = meter.create_histogram(
-    name="disney_api_llm_inference_duration_seconds",
-    description="LLM inference duration",
-    unit="s"
-)
-
-keyword_search_duration = meter.create_histogram(
-    name="disney_api_keyword_search_duration_seconds",
-    description="Keyword search duration",
-    unit="s"
-)
-
-# Filter usage metrics
-filter_usage_count = meter.create_counter(
-    name="disney_api_filter_usage_count",
-    description="Count of filter usage by type",
-    unit="1"
-)
-
-# Hybrid search strategy metrics
-hybrid_strategy_count = meter.create_counter(
-    name="disney_api_hybrid_strategy_count",
-    description="Count of hybrid search strategy selection",
-    unit="1"
-)
-
-candidate_count = meter.create_histogram(
-    name="disney_api_candidate_count",
-    description="Number of candidates from pandas filtering",
-    unit="1"
-)
-
-# Cache metrics
-cache_hit_count = meter.create_counter(
-    name="disney_api_cache_hit_count",
-    description="Total number of cache hits",
-    unit="1"
-)
-
-cache_miss_count = meter.create_counter(
-    name="disney_api_cache_miss_count",
-    description="Total number of cache misses",
-    unit="1"
-)
-
-cache_size = meter.create_gauge(
-    name="disney_api_cache_size",
-    description="Current number of entries in cache",
-    unit="1"
-)
-
-cache_similarity_score = meter.create_histogram(
-    name="disney_api_cache_similarity_score",
-    description="Similarity score for cache hits",
-    unit="1"
-)
-
-# Answer quality metrics
-answer_length = meter.create_histogram(
-    name="disney_api_answer_length",
-    description="Length of generated answers in characters",
-    unit="1"
-)
-
-reviews_used_count = meter.create_histogram(
-    name="disney_api_reviews_used_count",
-    description="Number of reviews used to generate answer",
-    unit="1"
-)
-
-user_feedback_count = meter.create_counter(
-    name="disney_api_user_feedback_count",
-    description="Count of user feedback by rating",
-    unit="1"
-)
-
-query_complexity_score = meter.create_histogram(
-    name="disney_api_query_complexity_score",
-    description="Estimated complexity of user query (0.0-1.0)",
-    unit="1"
-)
-
-# Retrieval quality metrics
-retrieval_precision = meter.create_histogram(
-    name="disney_api_retrieval_precision",
-    description="Precision of retrieved reviews (relevant/total)",
-    unit="1"
-)
-
-
-@contextmanager
-def measure_duration(histogram: metrics.Histogram, attributes: dict[str, str] | None = None) -> Generator[None, None, None]:
-    """Context manager to measure duration and record to histogram.
+# Instruments start out as no-ops, so recording outside the app (scripts, tests,
+# before startup) is harmless; init_metrics() rebinds them once the meter
+# provider is configured
+request_duration: metrics.Histogram
+request_count: metrics.Counter
+error_count: metrics.Counter
+search_type_count: metrics.Counter
+reviews_returned: metrics.Histogram
+chromadb_search_duration: metrics.Histogram
+embedding_generation_duration: metrics.Histogram
+llm_inference_duration: metrics.Histogram
+keyword_search_duration: metrics.Histogram
+filter_usage_count: metrics.Counter
+hybrid_strategy_count: metrics.Counter
+candidate_count: metrics.Histogram
+cache_hit_count: metrics.Counter
+cache_miss_count: metrics.Counter
+cache_size: metrics._Gauge
+cache_similarity_score: metrics.Histogram
+answer_length: metrics.Histogram
+reviews_used_count: metrics.Histogram
+user_feedback_count: metrics.Counter
+query_complexity_score: metrics.Histogram
+retrieval_precision: metrics.Histogram
+
+_initialized = False
+
+# Shared read-only default so measurements without attributes allocate nothing
+_NO_ATTRIBUTES: Mapping[str, str] = MappingProxyType({})
+
+
+def init_metrics() -> None:
+    """Create all custom metric instruments.
+    
+    Must be called after ``setup_telemetry`` so instruments are created against
+    the configured meter provider; until then measurements are dropped. Safe to
+    call more than once.
+    """
+    global _initialized
+    
+    if _initialized:
+        return
+    
+    _bind_instruments(get_meter(__name__))
+    _initialized = True
+
+
+def _bind_instruments(meter: metrics.Meter) -> None:
+    """Create every instrument from ``meter`` and bind it to its module global.
+    
+    Args:
+        meter: Meter to create the instruments with.
+    """
+    global request_duration, request_count, error_count, search_type_count
+    global reviews_returned, chromadb_search_duration
+    global embedding_generation_duration, llm_inference_duration
+    global keyword_search_duration, filter_usage_count, hybrid_strategy_count
+    global candidate_count, cache_hit_count, cache_miss_count, cache_size
+    global cache_similarity_score, answer_length, reviews_used_count
+    global user_feedback_count, query_complexity_score, retrieval_precision
+    
+    # Request metrics
+    request_duration = meter.create_histogram(
+        name="disney_api_request_duration_seconds",
+        description="Request duration in seconds",
+        unit="s"
+    )
+    
+    request_count = meter.create_counter(
+        name="disney_api_request_count",
+        description="Total number of API requests",
+        unit="1"
+    )
+    
+    error_count = meter.create_counter(
+        name="disney_api_error_count",
+        description="Total number of errors",
+        unit="1"
+    )
+    
+    # Search metrics
+    search_type_count = meter.create_counter(
+        name="disney_api_search_type_count",
+        description="Count of searches by type (keyword/hybrid)",
+        unit="1"
+    )
+    
+    reviews_returned = meter.create_histogram(
+        name="disney_api_reviews_returned",
+        description="Number of reviews returned per query",
+        unit="1"
+    )
+    
+    # Component latency metrics
+    chromadb_search_duration = meter.create_histogram(
+        name="disney_api_chromadb_search_duration_seconds",
+        description="ChromaDB vector search duration",
+        unit="s"
+    )
+    
+    embedding_generation_duration = meter.create_histogram(
+        name="disney_api_embedding_generation_duration_seconds",
+        description="Embedding generation duration",
+        unit="s"
+    )
+    
+    llm_inference_duration = meter.create_histogram(
+        name="disney_api_llm_inference_duration_seconds",
+        description="LLM inference duration",
+        unit="s"
+    )
+    
+    keyword_search_duration = meter.create_histogram(
+        name="disney_api_keyword_search_duration_seconds",
+        description="Keyword search duration",
+        unit="s"
+    )
+    
+    # Filter usage metrics
+    filter_usage_count = meter.create_counter(
+        name="disney_api_filter_usage_count",
+        description="Count of filter usage by type",
+        unit="1"
+    )
+    
+    # Hybrid search strategy metrics
+    hybrid_strategy_count = meter.create_counter(
+        name="disney_api_hybrid_strategy_count",
+        description="Count of hybrid search strategy selection",
+        unit="1"
+    )
+    
+    candidate_count = meter.create_histogram(
+        name="disney_api_candidate_count",
+        description="Number of candidates from pandas filtering",
+        unit="1"
+    )
+    
+    # Cache metrics
+    cache_hit_count = meter.create_counter(
+        name="disney_api_cache_hit_count",
+        description="Total number of cache hits",
+        unit="1"
+    )
+    
+    cache_miss_count = meter.create_counter(
+        name="disney_api_cache_miss_count",
+        description="Total number of cache misses",
+        unit="1"
+    )
+    
+    cache_size = meter.create_gauge(
+        name="disney_api_cache_size",
+        description="Current number of entries in cache",
+        unit="1"
+    )
+    
+    cache_similarity_score = meter.create_histogram(
+        name="disney_api_cache_similarity_score",
+        description="Similarity score for cache hits",
+        unit="1"
+    )
+    
+    # Answer quality metrics
+    answer_length = meter.create_histogram(
+        name="disney_api_answer_length",
+        description="Length of generated answers in characters",
+        unit="1"
+    )
+    
+    reviews_used_count = meter.create_histogram(
+        name="disney_api_reviews_used_count",
+        description="Number of reviews used to generate answer",
+        unit="1"
+    )
+    
+    user_feedback_count = meter.create_counter(
+        name="disney_api_user_feedback_count",
+        description="Count of user feedback by rating",
+        unit="1"
+    )
+    
+    query_complexity_score = meter.create_histogram(
+        name="disney_api_query_complexity_score",
+        description="Estimated complexity of user query (0.0-1.0)",
+        unit="1"
+    )
+    
+    # Retrieval quality metrics
+    retrieval_precision = meter.create_histogram(
+        name="disney_api_retrieval_precision",
+        description="Precision of retrieved reviews (relevant/total)",
+        unit="1"
+    )
+
+
+_bind_instruments(metrics.NoOpMeter(__name__))
+
+
+class _Timer:
+    """Context manager that records the duration of its block to a histogram.
+    
+    Only successful executions are recorded so failures don't skew latency.
+    """
+    
+    __slots__ = ("histogram", "attributes", "_start_ns")
+    
+    def __init__(self, histogram: metrics.Histogram, attributes: Mapping[str, str]) -> None:
+        self.histogram = histogram
+        self.attributes = attributes
+        self._start_ns = 0
+    
+    def __enter__(self) -> _Timer:
+        self._start_ns = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self, exc_type: type[BaseException] | None, *_: Any) -> None:
+        if exc_type is None:
+            self.histogram.record(
+                (time.perf_counter_ns() - self._start_ns) * 1e-9,
+                attributes=self.attributes
+            )
+
+
+def measure_duration(histogram: metrics.Histogram, attributes: Mapping[str, str] | None = None) -> _Timer:
+    """Create a context manager to measure duration and record to histogram.
     
     Args:
         histogram: The histogram to record duration to.
         attributes: Optional attributes to add to the measurement.
         
-    Yields:
-        None
+    Returns:
+        Context manager timing the enclosed block.
     """
-    start_time = time.time()
-    try:
-        yield
-    finally:
-        duration = time.time() - start_time
-        histogram.record(duration, attributes=attributes or {})
+    return _Timer(histogram, attributes or _NO_ATTRIBUTES)
+
+
+# Attribute sets are interned: label values come from small fixed vocabularies,
+# so each combination is built once and shared by every measurement
+@lru_cache(maxsize=256)
+def _attribute(key: str, value: str) -> Mapping[str, str]:
+    """Get the shared read-only attribute set for a single label."""
+    return MappingProxyType({key: value})
+
+
+@lru_cache(maxsize=256)
+def _request_attributes(endpoint: str, method: str, status_code: int) -> Mapping[str, str]:
+    """Get the shared read-only attribute set for an API request."""
+    return MappingProxyType({
+        "endpoint": endpoint,
+        "method": method,
+        "status_code": str(status_code)
+    })
+
+
+@lru_cache(maxsize=32)
+def _search_type_attributes(search_type: str, has_filters: bool) -> Mapping[str, str]:
+    """Get the shared read-only attribute set for a search type."""
+    return MappingProxyType({
+        "search_type": search_type,
+        "has_filters": str(has_filters)
+    })
 
 
 def record_request(endpoint: str, method: str, status_code: int, duration: float) -> None:
@@ -175,11 +283,7 @@ def record_request(endpoint: str, method: str, status_code: int, duration: float
         status_code: HTTP status code.
         duration: Request duration in seconds.
     """
-    attributes = {
-        "endpoint": endpoint,
-        "method": method,
-        "status_code": str(status_code)
-    }
+    attributes = _request_attributes(endpoint, method, status_code)
     
     request_count.add(1, attributes)
     request_duration.record(duration, attributes)
@@ -189,6 +293,47 @@ def record_request(endpoint: str, method: str, status_code: int, duration: float
         error_count.add(1, attributes)
 
 
+# /query outcomes are recorded on every request, so bind their attribute sets once
+_QUERY_SUCCESS_ATTRIBUTES = _request_attributes("/query", "POST", 200)
+_QUERY_ERROR_ATTRIBUTES = _request_attributes("/query", "POST", 500)
+
+
+def record_query_request(duration: float, succeeded: bool = True) -> None:
+    """Record API request metrics for a ``POST /query`` call.
+    
+    Equivalent to ``record_request("/query", "POST", 200 or 500, duration)``
+    without the per-call attribute lookup.
+    
+    Args:
+        duration: Request duration in seconds.
+        succeeded: Whether the request returned 200 (otherwise 500).
+    """
+    if succeeded:
+        request_count.add(1, _QUERY_SUCCESS_ATTRIBUTES)
+        request_duration.record(duration, _QUERY_SUCCESS_ATTRIBUTES)
+    else:
+        request_count.add(1, _QUERY_ERROR_ATTRIBUTES)
+        request_duration.record(duration, _QUERY_ERROR_ATTRIBUTES)
+        error_count.add(1, _QUERY_ERROR_ATTRIBUTES)
+
+
+def record_cache_lookup(hit: bool, cache_size_value: int, similarity_score: float | None = None) -> None:
+    """Record the outcome of a query cache lookup and the current cache size.
+    
+    Args:
+        hit: Whether the lookup was a cache hit.
+        cache_size_value: Current cache size.
+        similarity_score: Optional similarity score for a cache hit.
+    """
+    if hit:
+        cache_hit_count.add(1)
+        if similarity_score is not None:
+            cache_similarity_score.record(similarity_score)
+    else:
+        cache_miss_count.add(1)
+    cache_size.set(cache_size_value)
+
+
 def record_search_type(search_type: str, has_filters: bool) -> None:
     """Record search type metrics.
     
@@ -196,10 +341,7 @@ def record_search_type(search_type: str, has_filters: bool) -> None:
         search_type: Type of search (keyword, hybrid, semantic).
         has_filters: Whether filters were applied.
     """
-    attributes = {
-        "search_type": search_type,
-        "has_filters": str(has_filters)
-    }
+    attributes = _search_type_attributes(search_type, has_filters)
     search_type_count.add(1, attributes)
 
 
@@ -210,7 +352,7 @@ def record_reviews_returned(count: int, search_type: str) -> None:
         count: Number of reviews returned.
         search_type: Type of search performed.
     """
-    attributes = {"search_type": search_type}
+    attributes = _attribute("search_type", search_type)
     reviews_returned.record(count, attributes)
 
 
@@ -220,7 +362,7 @@ def record_filter_usage(filter_type: str) -> None:
     Args:
         filter_type: Type of filter (branch, location, both).
     """
-    attributes = {"filter_type": filter_type}
+    attributes = _attribute("filter_type", filter_type)
     filter_usage_count.add(1, attributes)
 
 
@@ -231,11 +373,9 @@ def record_hybrid_strategy(strategy: str, candidate_count_value: int) -> None:
         strategy: Strategy used (id_filtered, full_search).
         candidate_count_value: Number of candidates from pandas filtering.
     """
-    strategy_attributes = {"strategy": strategy}
-    hybrid_strategy_count.add(1, strategy_attributes)
-    
-    candidate_attributes = {"strategy": strategy}
-    candidate_count.record(candidate_count_value, candidate_attributes)
+    attributes = _attribute("strategy", strategy)
+    hybrid_strategy_count.add(1, attributes)
+    candidate_count.record(candidate_count_value, attributes)
 
 
 def record_cache_hit(similarity_score: float | None = None) -> None:
@@ -281,7 +421,7 @@ def record_user_feedback(rating: str, question: str | None = None) -> None:
         rating: User rating (thumbs_up, thumbs_down).
         question: Optional question text for context.
     """
-    attributes = {"rating": rating}
+    attributes = _attribute("rating", rating)
     user_feedback_count.add(1, attributes)
 
 
@@ -292,7 +432,7 @@ def record_query_complexity(complexity: float, query_type: str) -> None:
         complexity: Complexity score (0.0 = simple, 1.0 = complex).
         query_type: Type of query (simple, medium, complex).
     """
-    attributes = {"query_type": query_type}
+    attributes = _attribute("query_type", query_type)
     query_complexity_score.record(complexity, attributes)
 
 
@@ -303,5 +443,5 @@ def record_retrieval_precision(precision: float, search_type: str) -> None:
         precision: Precision score (relevant_reviews / total_reviews).
         search_type: Type of search performed.
     """
-    attributes = {"search_type": search_type}
+    attributes = _attribute("search_type", search_type)
     retrieval_precision.record(precision, attributes)
@@ -0,0 +1,82 @@
+"""Application settings parsed once from the environment."""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+
+def _load_dotenv() -> None:
+    """Load variables from a ``.env`` file if one is present.
+    
+    The file is looked up at ``DOTENV_PATH`` (default: ``.env`` in the working
+    directory). Deployments without the file skip the ``dotenv`` import and
+    its directory search entirely; existing environment variables always win.
+    """
+    dotenv_path = os.getenv("DOTENV_PATH", ".env")
+    if not os.path.isfile(dotenv_path):
+        return
+    
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path, override=False)
+
+
+# Load environment variables before the settings below are read
+_load_dotenv()
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Immutable application configuration.
+    
+    Every value is read from the environment (or ``.env``) exactly once, when
+    this module is first imported.
+    """
+    
+    # Root log level ("DEBUG", "INFO", "WARNING", ...)
+    log_level: str = os.getenv("LOG_LEVEL", "INFO").upper()
+    
+    # OpenAI
+    openai_api_key: str | None = os.getenv("OPENAI_API_KEY")
+    # Upper bound on in-flight chat completion calls per process
+    openai_max_concurrency: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+    # Approximate token budget for the review context in LLM prompts (0 = no limit)
+    llm_max_context_tokens: int = int(os.getenv("LLM_MAX_CONTEXT_TOKENS", "1500"))
+    
+    # Embedding model backend on CPU ("torch", or "onnx"/"openvino" with
+    # optimum installed) and, for those, an optional exported model file such
+    # as "onnx/model_qint8_avx512_vnni.onnx" (int8-quantized weights)
+    embedding_backend: str = os.getenv("EMBEDDING_BACKEND", "torch")
+    embedding_model_file: str | None = os.getenv("EMBEDDING_MODEL_FILE") or None
+    # Compile the torch encoder with torch.compile (cache compiled kernels across
+    # restarts and workers by pointing TORCHINDUCTOR_CACHE_DIR at shared storage)
+    embedding_compile: bool = os.getenv("EMBEDDING_COMPILE", "0") == "1"
+    # Number of server worker processes sharing this machine's CPUs (0 if
+    # unknown, e.g. a single plain uvicorn process); each worker's torch
+    # intra-op thread pool is sized to its share of the cores
+    web_concurrency: int = int(os.getenv("WEB_CONCURRENCY") or "0")
+    # Load the model when the app module is imported, so a preloading server
+    # (gunicorn --preload) shares its weights copy-on-write with its workers
+    preload_embedding_model: bool = os.getenv("PRELOAD_EMBEDDING_MODEL", "0") == "1"
+    
+    # Optional services; disabled ones are never connected at startup
+    enable_cache: bool = os.getenv("ENABLE_CACHE", "1") == "1"
+    enable_vector_store: bool = os.getenv("ENABLE_VECTOR_STORE", "1") == "1"
+    
+    # Redis query cache
+    redis_host: str = os.getenv("REDIS_HOST", "localhost")
+    redis_port: int = int(os.getenv("REDIS_PORT", "6379"))
+    cache_similarity_threshold: float = float(os.getenv("CACHE_SIMILARITY_THRESHOLD", "0.95"))
+    cache_ttl_hours: int = int(os.getenv("CACHE_TTL_HOURS", "24"))
+    
+    # OpenTelemetry; when disabled no providers are installed and request
+    # handlers skip span creation entirely
+    telemetry_enabled: bool = os.getenv("OTEL_ENABLED", "1") == "1"
+    # OpenTelemetry export ("grpc" or "http/protobuf")
+    otlp_protocol: str = os.getenv("OTEL_EXPORTER_OTLP_PROTOCOL", "grpc")
+    otlp_grpc_endpoint: str = os.getenv("OTLP_GRPC_ENDPOINT", "http://localhost:4317")
+    otlp_http_endpoint: str = os.getenv("OTLP_HTTP_ENDPOINT", "http://localhost:4318")
+    # Fraction of traces whose outbound HTTPX (OpenAI/ChromaDB) spans are kept
+    httpx_trace_sample_ratio: float = float(os.getenv("OTEL_HTTPX_SAMPLE_RATIO", "0.1"))
+
+
+SETTINGS = Settings()
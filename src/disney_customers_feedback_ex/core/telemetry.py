@@ -2,21 +2,38 @@
 from __future__ import annotations
 
 import logging
+from contextlib import AbstractContextManager, nullcontext
 from typing import Any
 
+from grpc import Compression
 from opentelemetry import metrics, trace
-from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
 from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.sdk.metrics.export import MetricExporter, PeriodicExportingMetricReader
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from disney_customers_feedback_ex.core.settings import SETTINGS
 
 logger = logging.getLogger(__name__)
 
+# Providers installed by setup_telemetry, flushed and stopped by shutdown_telemetry
+_providers: list[TracerProvider | MeterProvider] = []
+
+
+def _use_http_exporter() -> bool:
+    """Check whether OTLP should be exported over HTTP instead of gRPC.
+    
+    Returns:
+        True if the HTTP/protobuf exporter was requested.
+    """
+    return SETTINGS.otlp_protocol.startswith("http")
+
 
 def setup_telemetry(app: Any, service_name: str = "disney-customer-feedback-api") -> None:
     """Set up OpenTelemetry instrumentation for the FastAPI application.
@@ -33,7 +50,7 @@ def setup_telemetry(app: Any, service_name: str = "disney-customer-feedback-api"
     })
     
     # Set up tracing
-    setup_tracing(resource)
+    span_processor = setup_tracing(resource)
     
     # Set up metrics
     setup_metrics(resource)
@@ -41,36 +58,69 @@ def setup_telemetry(app: Any, service_name: str = "disney-customer-feedback-api"
     # Instrument FastAPI
     FastAPIInstrumentor.instrument_app(app)
     
-    # Instrument HTTPX (for OpenAI and ChromaDB calls)
-    HTTPXClientInstrumentor().instrument()
+    # Instrument HTTPX (for OpenAI and ChromaDB calls). Outbound calls get
+    # their own provider sampling a fraction of traces, while ingress spans
+    # from FastAPI stay fully sampled on the global provider. Spans with a
+    # parent follow the parent's decision, so a trace is never split; only
+    # outbound calls made outside any request trace are ratio-sampled.
+    httpx_tracer_provider = TracerProvider(
+        resource=resource,
+        sampler=ParentBased(root=TraceIdRatioBased(SETTINGS.httpx_trace_sample_ratio))
+    )
+    httpx_tracer_provider.add_span_processor(span_processor)
+    HTTPXClientInstrumentor().instrument(tracer_provider=httpx_tracer_provider)
+    _providers.append(httpx_tracer_provider)
     
-    logger.info(f"OpenTelemetry instrumentation configured for {service_name}")
+    logger.info("OpenTelemetry instrumentation configured for %s", service_name)
 
 
-def setup_tracing(resource: Resource) -> None:
+def setup_tracing(resource: Resource) -> BatchSpanProcessor:
     """Configure distributed tracing with OTLP exporter.
     
     Args:
         resource: OpenTelemetry resource with service information.
+        
+    Returns:
+        The span processor exporting to the collector.
     """
     # Create OTLP trace exporter (sends to OpenTelemetry Collector)
-    otlp_exporter = OTLPSpanExporter(
-        endpoint="http://localhost:4318/v1/traces",
-        timeout=10
-    )
+    otlp_exporter: SpanExporter
+    if _use_http_exporter():
+        from opentelemetry.exporter.otlp.proto.http import Compression as HTTPCompression
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter as HTTPSpanExporter,
+        )
+        otlp_exporter = HTTPSpanExporter(
+            endpoint=f"{SETTINGS.otlp_http_endpoint}/v1/traces",
+            timeout=10,
+            compression=HTTPCompression.Gzip
+        )
+    else:
+        otlp_exporter = OTLPSpanExporter(
+            endpoint=SETTINGS.otlp_grpc_endpoint,
+            insecure=True,
+            timeout=10,
+            compression=Compression.Gzip
+        )
     
     # Create tracer provider
     tracer_provider = TracerProvider(resource=resource)
     
-    # Add batch span processor
-    tracer_provider.add_span_processor(
-        BatchSpanProcessor(otlp_exporter)
+    # Add batch span processor with a bounded queue and larger export batches
+    span_processor = BatchSpanProcessor(
+        otlp_exporter,
+        max_queue_size=4096,
+        max_export_batch_size=512,
+        schedule_delay_millis=5000
     )
+    tracer_provider.add_span_processor(span_processor)
     
     # Set as global tracer provider
     trace.set_tracer_provider(tracer_provider)
+    _providers.append(tracer_provider)
     
     logger.info("Tracing configured with OTLP exporter")
+    return span_processor
 
 
 def setup_metrics(resource: Resource) -> None:
@@ -80,10 +130,24 @@ def setup_metrics(resource: Resource) -> None:
         resource: OpenTelemetry resource with service information.
     """
     # Create OTLP metric exporter
-    otlp_exporter = OTLPMetricExporter(
-        endpoint="http://localhost:4318/v1/metrics",
-        timeout=10
-    )
+    otlp_exporter: MetricExporter
+    if _use_http_exporter():
+        from opentelemetry.exporter.otlp.proto.http import Compression as HTTPCompression
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
+            OTLPMetricExporter as HTTPMetricExporter,
+        )
+        otlp_exporter = HTTPMetricExporter(
+            endpoint=f"{SETTINGS.otlp_http_endpoint}/v1/metrics",
+            timeout=10,
+            compression=HTTPCompression.Gzip
+        )
+    else:
+        otlp_exporter = OTLPMetricExporter(
+            endpoint=SETTINGS.otlp_grpc_endpoint,
+            insecure=True,
+            timeout=10,
+            compression=Compression.Gzip
+        )
     
     # Create metric reader with periodic export
     metric_reader = PeriodicExportingMetricReader(
@@ -99,10 +163,26 @@ def setup_metrics(resource: Resource) -> None:
     
     # Set as global meter provider
     metrics.set_meter_provider(meter_provider)
+    _providers.append(meter_provider)
     
     logger.info("Metrics configured with OTLP exporter")
 
 
+def shutdown_telemetry() -> None:
+    """Flush buffered spans and metrics and stop the providers from setup_telemetry.
+    
+    Safe to call when telemetry was never set up.
+    """
+    # Most recently installed first, so the HTTPX provider is flushed before
+    # the global tracer provider shuts down the span processor they share
+    while _providers:
+        provider = _providers.pop()
+        try:
+            provider.shutdown()
+        except Exception as e:
+            logger.warning("Failed to shut down telemetry provider: %s", e)
+
+
 def get_tracer(name: str) -> trace.Tracer:
     """Get a tracer for creating custom spans.
     
@@ -115,6 +195,26 @@ def get_tracer(name: str) -> trace.Tracer:
     return trace.get_tracer(name)
 
 
+# Reusable stand-in for a span context manager while telemetry is disabled;
+# attribute setters on the invalid span are no-ops
+_NO_SPAN: AbstractContextManager[trace.Span] = nullcontext(trace.INVALID_SPAN)
+
+
+def start_span(tracer: trace.Tracer, name: str) -> AbstractContextManager[trace.Span]:
+    """Start a span as the current span, unless telemetry is disabled.
+    
+    Args:
+        tracer: Tracer to create the span with.
+        name: Name of the span.
+        
+    Returns:
+        Context manager yielding the new span, or a shared no-op span.
+    """
+    if not SETTINGS.telemetry_enabled:
+        return _NO_SPAN
+    return tracer.start_as_current_span(name)
+
+
 def get_meter(name: str) -> metrics.Meter:
     """Get a meter for creating custom metrics.
     
@@ -1,25 +1,77 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import re
 import time
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse, Response
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from pydantic import BaseModel
 
 from disney_customers_feedback_ex.core.lifespan import (
     lifespan,
-    get_review_service,
+    get_search,
     get_llm_service,
     get_cache_service,
     get_embedding_service,
     get_vector_store,
 )
-from disney_customers_feedback_ex.core.telemetry import get_tracer
+from disney_customers_feedback_ex.core.telemetry import get_tracer, start_span
 from disney_customers_feedback_ex.core import metrics as app_metrics
 
+if TYPE_CHECKING:
+    import numpy as np
+    
+    from disney_customers_feedback_ex.services.cache_service import QueryCacheService
+
 logger = logging.getLogger(__name__)
+# Created once at import; until setup_telemetry installs the SDK provider this
+# is a proxy, which binds to the real tracer on its first span and caches it
+tracer = get_tracer(__name__)
+
+# Filter keyword dispatch tables, in priority order when a question mentions
+# several branches
+_BRANCH_KEYWORDS = {
+    "hong kong": "Hong_Kong",
+    "california": "California",
+    "paris": "Paris",
+}
+_LOCATION_KEYWORDS = {
+    "australia": "Australia",
+}
+# Single alternation so the question is scanned once for all keywords; for a
+# handful of literals this matches an Aho-Corasick automaton without the extra
+# dependency, and _extract_filters memoizes the result per question
+_FILTER_KEYWORD_PATTERN = re.compile(
+    "|".join(re.escape(keyword) for keyword in (*_BRANCH_KEYWORDS, *_LOCATION_KEYWORDS))
+)
+
+
+@lru_cache(maxsize=2048)
+def _extract_filters(question: str) -> tuple[str | None, str | None]:
+    """Detect branch and reviewer location filters mentioned in a question.
+    
+    Args:
+        question: The user's question.
+        
+    Returns:
+        Tuple of (branch, location), each None if not mentioned.
+    """
+    # Lowercased here, so repeated questions hit the LRU without copying
+    mentioned = set(_FILTER_KEYWORD_PATTERN.findall(question.lower()))
+    branch = next(
+        (value for keyword, value in _BRANCH_KEYWORDS.items() if keyword in mentioned),
+        None
+    )
+    location = next(
+        (value for keyword, value in _LOCATION_KEYWORDS.items() if keyword in mentioned),
+        None
+    )
+    return branch, location
 
 
 app = FastAPI(
@@ -27,18 +79,18 @@ app = FastAPI(
     description="API for managing Disney customer feedback and reviews",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 
 @app.get("/")
-async def root() -> JSONResponse:
+async def root() -> ORJSONResponse:
     """Root endpoint that returns a welcome message.
     
     Returns:
-        JSONResponse with welcome message and API information.
+        ORJSONResponse with welcome message and API information.
     """
-    logger.info("Root endpoint accessed")
-    return JSONResponse(
+    return ORJSONResponse(
         content={
             "message": "Welcome to Disney Customer Feedback API! 🏰",
             "status": "healthy",
@@ -48,14 +100,13 @@ async def root() -> JSONResponse:
 
 
 @app.get("/health")
-async def health_check() -> JSONResponse:
+async def health_check() -> ORJSONResponse:
     """Health check endpoint.
     
     Returns:
-        JSONResponse indicating the API health status.
+        ORJSONResponse indicating the API health status.
     """
-    logger.info("Health check endpoint accessed")
-    return JSONResponse(
+    return ORJSONResponse(
         content={
             "status": "healthy",
             "service": "disney-customer-feedback-api"
@@ -63,46 +114,67 @@ async def health_check() -> JSONResponse:
     )
 
 
+@lru_cache(maxsize=1)
+def _metrics_snapshot(second: int) -> bytes:
+    """Serialize the Prometheus registry, at most once per wall-clock second.
+    
+    Args:
+        second: Current Unix time in whole seconds; only used as the cache key.
+        
+    Returns:
+        Metrics in the Prometheus text exposition format.
+    """
+    return generate_latest()
+
+
 @app.get("/metrics")
 async def metrics() -> Response:
     """Prometheus metrics endpoint.
     
+    Scrapes within the same second share one serialized snapshot.
+    
     Returns:
         Response with Prometheus metrics in text format.
     """
-    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    return Response(content=_metrics_snapshot(int(time.time())), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/cache/stats")
-async def cache_stats() -> JSONResponse:
+async def cache_stats(request: Request) -> ORJSONResponse:
     """Get cache statistics.
     
+    Args:
+        request: FastAPI request object.
+        
     Returns:
-        JSONResponse with cache statistics.
+        ORJSONResponse with cache statistics.
     """
-    cache_service = get_cache_service()
+    cache_service = get_cache_service(request)
     if cache_service is None:
         raise HTTPException(status_code=503, detail="Cache service not initialized")
     
     stats = cache_service.get_stats()
     logger.info("Cache stats endpoint accessed")
-    return JSONResponse(content=stats)
+    return ORJSONResponse(content=stats)
 
 
 @app.post("/cache/clear")
-async def clear_cache() -> JSONResponse:
+async def clear_cache(request: Request) -> ORJSONResponse:
     """Clear the query cache.
     
+    Args:
+        request: FastAPI request object.
+        
     Returns:
-        JSONResponse indicating success.
+        ORJSONResponse indicating success.
     """
-    cache_service = get_cache_service()
+    cache_service = get_cache_service(request)
     if cache_service is None:
         raise HTTPException(status_code=503, detail="Cache service not initialized")
     
     cache_service.clear()
     logger.info("Cache cleared via API endpoint")
-    return JSONResponse(content={"status": "success", "message": "Cache cleared"})
+    return ORJSONResponse(content={"status": "success", "message": "Cache cleared"})
 
 
 class QueryRequest(BaseModel):
@@ -125,90 +197,142 @@ class FeedbackRequest(BaseModel):
     comment: str | None = None
 
 
+def _query_response(question: str, answer: str, num_reviews_used: int, cached: bool) -> ORJSONResponse:
+    """Build a ``/query`` response in the ``QueryResponse`` shape.
+    
+    Returning the response directly skips FastAPI's re-validation and
+    ``jsonable_encoder`` pass over the model; ``response_model`` still
+    documents the schema.
+    
+    Args:
+        question: The user's question.
+        answer: The answer.
+        num_reviews_used: Number of reviews used to generate the answer.
+        cached: Whether the answer came from the cache.
+        
+    Returns:
+        ORJSONResponse with the query result.
+    """
+    return ORJSONResponse({
+        "question": question,
+        "answer": answer,
+        "num_reviews_used": num_reviews_used,
+        "cached": cached
+    })
+
+
+async def _store_in_cache(
+    cache_service: QueryCacheService,
+    question: str,
+    answer: str,
+    num_reviews_used: int,
+    query_embedding: np.ndarray | None
+) -> None:
+    """Store a generated answer in the query cache.
+    
+    Runs as a background task once the response has been sent, so the
+    Redis writes never add to request latency.
+    
+    Args:
+        cache_service: The query cache.
+        question: The user's question.
+        answer: The generated answer.
+        num_reviews_used: Number of reviews used to generate the answer.
+        query_embedding: Precomputed embedding of the question, if available.
+    """
+    await asyncio.to_thread(
+        cache_service.set, question, answer, num_reviews_used, query_embedding
+    )
+    app_metrics.update_cache_size(cache_service.size())
+    logger.info("Stored answer in cache for question: %s", question)
+
+
 @app.post("/query", response_model=QueryResponse)
-async def query_llm(request: QueryRequest, fastapi_request: Request) -> QueryResponse:
+async def query_llm(
+    request: QueryRequest,
+    fastapi_request: Request,
+    background_tasks: BackgroundTasks
+) -> ORJSONResponse:
     """Query the LLM with a question about Disney parks using review data.
     
     Args:
         request: The query request containing the question.
-        fastapi_request: FastAPI request object for tracing.
+        fastapi_request: FastAPI request object for tracing and service lookup.
+        background_tasks: Tasks run after the response is sent (cache write).
         
     Returns:
-        QueryResponse with the question, answer, and number of reviews used.
+        ORJSONResponse shaped as QueryResponse with the question, answer, and number of reviews used.
     """
-    start_time = time.time()
-    tracer = get_tracer(__name__)
+    start_time = time.perf_counter()
     
     # Get services
     try:
-        review_service = get_review_service()
-        llm_service = get_llm_service()
+        search_type, search = get_search(fastapi_request)
+        llm_service = get_llm_service(fastapi_request)
     except RuntimeError as e:
         raise HTTPException(status_code=503, detail=str(e))
     
-    cache_service = get_cache_service()
-    embedding_service = get_embedding_service()
-    vector_store = get_vector_store()
+    cache_service = get_cache_service(fastapi_request)
+    embedding_service = get_embedding_service(fastapi_request)
+    vector_store = get_vector_store(fastapi_request)
     
-    logger.info(f"Query endpoint accessed with question: {request.question}")
+    logger.info("Query endpoint accessed with question: %s", request.question)
     
     # Estimate query complexity
     complexity_score, complexity_type = llm_service.estimate_query_complexity(request.question)
     app_metrics.record_query_complexity(complexity_score, complexity_type)
-    logger.info(f"Query complexity: {complexity_type} (score: {complexity_score:.2f})")
+    logger.info("Query complexity: %s (score: %.2f)", complexity_type, complexity_score)
     
-    with tracer.start_as_current_span("query_endpoint") as span:
+    with start_span(tracer, "query_endpoint") as span:
         try:
             span.set_attribute("question", request.question)
             
+            # Embed the question once; the cache lookup, the cache write and
+            # the vector search all reuse this vector
+            query_embedding = None
+            if embedding_service and (cache_service or vector_store):
+                try:
+                    with app_metrics.measure_duration(
+                        app_metrics.embedding_generation_duration,
+                        {"operation": "query_embedding"}
+                    ):
+                        query_embedding = await embedding_service.embed_query_async(
+                            request.question
+                        )
+                except Exception as e:
+                    logger.warning("Failed to embed question, services will retry: %s", e)
+            
             # Check cache first
             if cache_service:
-                cached_result = cache_service.get(request.question)
+                cached_result = await asyncio.to_thread(
+                    cache_service.get, request.question, query_embedding
+                )
                 if cached_result:
-                    logger.info(f"Cache hit for question: {request.question}")
+                    logger.info("Cache hit for question: %s", request.question)
                     span.set_attribute("cache_hit", True)
                     
-                    # Record cache hit metrics
-                    app_metrics.record_cache_hit(cached_result.get("cache_similarity"))
-                    app_metrics.update_cache_size(len(cache_service.cache))
-                    
-                    duration = time.time() - start_time
-                    app_metrics.record_request(
-                        endpoint="/query",
-                        method="POST",
-                        status_code=200,
-                        duration=duration
+                    # Record cache hit and request metrics
+                    app_metrics.record_cache_lookup(
+                        True, cache_service.size(), cached_result.get("cache_similarity")
                     )
+                    app_metrics.record_query_request(time.perf_counter() - start_time)
                     
-                    return QueryResponse(
+                    return _query_response(
                         question=request.question,
                         answer=cached_result["answer"],
                         num_reviews_used=cached_result["num_reviews_used"],
                         cached=True
                     )
                 else:
-                    logger.info(f"Cache miss for question: {request.question}")
+                    logger.info("Cache miss for question: %s", request.question)
                     span.set_attribute("cache_hit", False)
                     
                     # Record cache miss metrics
-                    app_metrics.record_cache_miss()
-                    app_metrics.update_cache_size(len(cache_service.cache))
-            
-            # Extract potential filters from the question (simple keyword matching)
-            branch = None
-            location = None
+                    app_metrics.record_cache_lookup(False, cache_service.size())
             
-            # Simple branch detection
-            if "hong kong" in request.question.lower():
-                branch = "Hong_Kong"
-            elif "california" in request.question.lower():
-                branch = "California"
-            elif "paris" in request.question.lower():
-                branch = "Paris"
-                
-            # Simple location detection
-            if "australia" in request.question.lower():
-                location = "Australia"
+            # Everything below is skipped on a cache hit. Extract potential
+            # filters from the question (simple keyword matching)
+            branch, location = _extract_filters(request.question)
             
             # Record filter usage
             has_filters = branch is not None or location is not None
@@ -223,81 +347,72 @@ async def query_llm(request: QueryRequest, fastapi_request: Request) -> QueryRes
             span.set_attribute("has_branch_filter", branch is not None)
             span.set_attribute("has_location_filter", location is not None)
             
-            # Search for relevant reviews using hybrid search if available
-            search_type = "hybrid" if (embedding_service and vector_store) else "keyword"
+            # Search for relevant reviews (hybrid search if it was available at startup)
             app_metrics.record_search_type(search_type, has_filters)
             
-            with tracer.start_as_current_span("search_reviews") as search_span:
+            with start_span(tracer, "search_reviews") as search_span:
                 search_span.set_attribute("search_type", search_type)
                 
-                if embedding_service and vector_store:
-                    reviews = review_service.search_reviews_hybrid(
-                        query=request.question,
-                        branch=branch,
-                        location=location,
-                        max_results=10
-                    )
-                else:
-                    reviews = review_service.search_reviews(
-                        query=request.question,
-                        branch=branch,
-                        location=location,
-                        max_results=10
-                    )
+                # Searches embed the query, call ChromaDB and scan pandas frames,
+                # so run them in a worker thread to keep the event loop free
+                reviews = await asyncio.to_thread(
+                    search,
+                    query=request.question,
+                    branch=branch,
+                    location=location,
+                    max_results=10,
+                    query_embedding=query_embedding
+                )
                 
                 search_span.set_attribute("num_reviews", len(reviews))
                 app_metrics.record_reviews_returned(len(reviews), search_type)
             
             # Query LLM with context
-            with tracer.start_as_current_span("llm_query") as llm_span:
-                llm_span.set_attribute("num_reviews_context", len(reviews))
-                
+            with start_span(tracer, "llm_query") as llm_span:
                 with app_metrics.measure_duration(
                     app_metrics.llm_inference_duration,
                     {"model": "gpt-4o-mini"}
                 ):
-                    answer = llm_service.query_with_context(request.question, reviews)
+                    answer, num_reviews_used = await llm_service.answer_with_context(
+                        request.question, reviews
+                    )
                 
+                llm_span.set_attribute("num_reviews_context", num_reviews_used)
                 llm_span.set_attribute("answer_length", len(answer))
             
-            # Record answer quality metrics
-            app_metrics.record_answer_quality(answer, len(reviews))
+            # Record answer quality metrics (reviews past the context budget
+            # were not sent to the LLM, so they don't count as used)
+            app_metrics.record_answer_quality(answer, num_reviews_used)
             
-            logger.info(f"Successfully generated answer using {len(reviews)} reviews")
+            logger.info("Successfully generated answer using %s reviews", num_reviews_used)
             
-            # Store in cache
+            # Store in cache after the response is sent
             if cache_service:
-                cache_service.set(request.question, answer, len(reviews))
-                app_metrics.update_cache_size(len(cache_service.cache))
-                logger.info(f"Stored answer in cache for question: {request.question}")
+                background_tasks.add_task(
+                    _store_in_cache,
+                    cache_service,
+                    request.question,
+                    answer,
+                    num_reviews_used,
+                    query_embedding
+                )
             
             # Record request metrics
-            duration = time.time() - start_time
-            app_metrics.record_request(
-                endpoint="/query",
-                method="POST",
-                status_code=200,
-                duration=duration
-            )
+            app_metrics.record_query_request(time.perf_counter() - start_time)
             
-            return QueryResponse(
+            return _query_response(
                 question=request.question,
                 answer=answer,
-                num_reviews_used=len(reviews),
+                num_reviews_used=num_reviews_used,
                 cached=False
             )
             
         except Exception as e:
-            duration = time.time() - start_time
-            logger.error(f"Error processing query: {str(e)}")
+            duration = time.perf_counter() - start_time
+            logger.error("Error processing query: %s", e)
             
             # Record error metrics
-            app_metrics.record_request(
-                endpoint="/query",
-                method="POST",
-                status_code=500,
-                duration=duration
-            )
+            app_metrics.record_query_request(duration, succeeded=False)
             
             span.set_attribute("error", True)
             span.set_attribute("error_message", str(e))
@@ -306,14 +421,14 @@ async def query_llm(request: QueryRequest, fastapi_request: Request) -> QueryRes
 
 
 @app.post("/feedback")
-async def submit_feedback(request: FeedbackRequest) -> JSONResponse:
+async def submit_feedback(request: FeedbackRequest) -> ORJSONResponse:
     """Submit user feedback on an answer.
     
     Args:
         request: The feedback request containing question, rating, and optional comment.
         
     Returns:
-        JSONResponse indicating feedback was recorded.
+        ORJSONResponse indicating feedback was recorded.
     """
     # Validate rating
     if request.rating not in ["thumbs_up", "thumbs_down"]:
@@ -326,10 +441,12 @@ async def submit_feedback(request: FeedbackRequest) -> JSONResponse:
     app_metrics.record_user_feedback(request.rating, request.question)
     
     logger.info(
-        f"Feedback received: {request.rating} for question '{request.question[:50]}...'"
+        "Feedback received: %s for question '%s...'",
+        request.rating,
+        request.question[:50],
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         content={
             "status": "success",
             "message": "Feedback recorded successfully",
@@ -339,10 +456,32 @@ async def submit_feedback(request: FeedbackRequest) -> JSONResponse:
 
 
 if __name__ == "__main__":
+    import os
+    
     import uvicorn
-    uvicorn.run(
-        "disney_customers_feedback_ex.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
\ No newline at end of file
+    
+    if os.getenv("DEV"):
+        # Single auto-reloading worker for local development
+        os.environ["WEB_CONCURRENCY"] = "1"
+        uvicorn.run(
+            "disney_customers_feedback_ex.main:app",
+            host="0.0.0.0",
+            port=8000,
+            loop="uvloop",
+            http="httptools",
+            reload=True
+        )
+    else:
+        # uvloop/httptools ship with uvicorn[standard]; each worker loads its
+        # own model and reads WEB_CONCURRENCY to size its torch thread pool
+        workers = int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+        os.environ["WEB_CONCURRENCY"] = str(workers)
+        uvicorn.run(
+            "disney_customers_feedback_ex.main:app",
+            host="0.0.0.0",
+            port=8000,
+            loop="uvloop",
+            http="httptools",
+            workers=workers,
+            log_level="info",
+        )
\ No newline at end of file
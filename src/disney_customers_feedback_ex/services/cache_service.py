@@ -1,13 +1,14 @@
 """Query caching service using Redis for semantic similarity-based caching."""
 from __future__ import annotations
 
-import json
 import logging
 import os
+import threading
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Iterator
 
 import numpy as np
+import orjson
 import redis
 from redis.exceptions import RedisError
 
@@ -15,6 +16,9 @@ from disney_customers_feedback_ex.services.embedding_service import EmbeddingSer
 
 logger = logging.getLogger(__name__)
 
+# Identifiers requested per SSCAN page, each page followed by one MGET
+_SCAN_PAGE_SIZE = 500
+
 
 class CacheEntry:
     """Represents a cached query-answer pair with metadata."""
@@ -38,12 +42,15 @@ class CacheEntry:
         """
         self.question = question
         self.answer = answer
-        self.embedding = np.array(embedding, dtype=np.float32) if isinstance(embedding, list) else embedding
+        self.embedding = np.asarray(embedding, dtype=np.float32)
         self.num_reviews_used = num_reviews_used
         self.timestamp = timestamp or datetime.now()
     
     def to_dict(self) -> dict[str, Any]:
-        """Convert to dictionary for JSON serialization.
+        """Convert the metadata to a dictionary for JSON serialization.
+        
+        The embedding is not included; it is stored separately as raw
+        float32 bytes (see ``embedding_bytes``).
         
         Returns:
             Dictionary representation of the cache entry.
@@ -51,25 +58,35 @@ class CacheEntry:
         return {
             "question": self.question,
             "answer": self.answer,
-            "embedding": self.embedding.tolist(),
             "num_reviews_used": self.num_reviews_used,
             "timestamp": self.timestamp.isoformat()
         }
     
+    def embedding_bytes(self) -> bytes:
+        """Serialize the embedding as raw float32 bytes.
+        
+        Returns:
+            The embedding buffer, readable with ``np.frombuffer(..., dtype=np.float32)``.
+        """
+        return np.asarray(self.embedding, dtype=np.float32).tobytes()
+    
     @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> CacheEntry:
+    def from_dict(cls, data: dict[str, Any], embedding: bytes | np.ndarray) -> CacheEntry:
         """Create from dictionary.
         
         Args:
             data: Dictionary representation.
+            embedding: The embedding, as stored raw float32 bytes or an array.
             
         Returns:
             CacheEntry instance.
         """
+        if isinstance(embedding, bytes):
+            embedding = np.frombuffer(embedding, dtype=np.float32)
         return cls(
             question=data["question"],
             answer=data["answer"],
-            embedding=data["embedding"],
+            embedding=embedding,
             num_reviews_used=data["num_reviews_used"],
             timestamp=datetime.fromisoformat(data["timestamp"])
         )
@@ -113,17 +130,49 @@ class QueryCacheService:
             )
             # Test connection
             self.redis_client.ping()
-            logger.info(f"Connected to Redis at {redis_host}:{redis_port}")
+            logger.info("Connected to Redis at %s:%s", redis_host, redis_port)
         except RedisError as e:
-            logger.error(f"Failed to connect to Redis: {str(e)}")
+            logger.error("Failed to connect to Redis: %s", e)
             raise
         
         # Key prefixes
-        self.cache_key_prefix = "disney_cache:"
-        self.embedding_key_prefix = "disney_embedding:"
+        self.cache_key_prefix = b"disney_cache:"
+        # Embeddings are raw float32 bytes; the prefix differs from the old
+        # JSON-encoded "disney_embedding:" keys so those are never misread
+        self.embedding_key_prefix = b"disney_embedding_f32:"
         self.all_keys_set = "disney_cache_keys"
+        # Counter bumped by every change to the cached entries (set, eviction,
+        # clear) from any worker; never reset, so a value is never reused
+        self.generation_key = "disney_cache_generation"
+        
+        # In-process similarity index mirroring the embeddings stored in Redis:
+        # cache identifiers, their row positions, and a preallocated (capacity, D)
+        # matrix of L2-normalized rows of which the first ``_index_size`` are
+        # live. Redis stays authoritative; the index is synced incrementally
+        # whenever the Redis generation counter moves past the one it was
+        # synced at (e.g. another worker added or removed entries).
+        # Identifiers are kept as the raw bytes Redis returns, so keys are
+        # built without decoding and re-encoding them
+        self._index_keys: list[bytes] = []
+        self._index_positions: dict[bytes, int] = {}
+        self._index_matrix: np.ndarray | None = None
+        self._index_size = 0
+        self._indexed_generation: int | None = None
+        # Lookups and writes run on worker threads (asyncio.to_thread); every
+        # read or change of the index state above holds this lock (Redis
+        # round trips happen outside it, except while syncing)
+        self._index_lock = threading.RLock()
+        
+        # Warm the index at startup so the first lookup doesn't pay for loading
+        # every cached embedding; on failure the first lookup syncs instead
+        try:
+            generation = self._read_generation()
+            with self._index_lock:
+                self._sync_index(generation)
+        except RedisError as e:
+            logger.warning("Failed to warm cache similarity index: %s", e)
     
-    def _get_cache_key(self, identifier: str) -> str:
+    def _get_cache_key(self, identifier: bytes) -> bytes:
         """Generate cache key for a given identifier.
         
         Args:
@@ -132,9 +181,9 @@ class QueryCacheService:
         Returns:
             Redis key for the cache entry.
         """
-        return f"{self.cache_key_prefix}{identifier}"
+        return self.cache_key_prefix + identifier
     
-    def _get_embedding_key(self, identifier: str) -> str:
+    def _get_embedding_key(self, identifier: bytes) -> bytes:
         """Generate embedding key for a given identifier.
         
         Args:
@@ -143,146 +192,307 @@ class QueryCacheService:
         Returns:
             Redis key for the embedding.
         """
-        return f"{self.embedding_key_prefix}{identifier}"
+        return self.embedding_key_prefix + identifier
+    
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        """L2-normalize an embedding so cosine similarity becomes a dot product.
+        
+        Args:
+            embedding: Embedding vector.
+            
+        Returns:
+            Unit-length float32 vector (all zeros if the input has zero norm).
+        """
+        norm = np.linalg.norm(embedding)
+        if norm == 0:
+            return np.zeros_like(embedding, dtype=np.float32)
+        return (embedding / norm).astype(np.float32, copy=False)
+    
+    def _iter_member_pages(self) -> Iterator[list[bytes]]:
+        """Stream the cache identifiers from the Redis key set page by page.
+        
+        Uses an SSCAN cursor so no single reply carries the whole set. As with
+        any SCAN, an identifier may occasionally be returned twice.
+        
+        Yields:
+            Lists of raw identifiers.
+        """
+        cursor = 0
+        while True:
+            cursor, keys = self.redis_client.sscan(self.all_keys_set, cursor, count=_SCAN_PAGE_SIZE)
+            if keys:
+                yield list(keys)
+            if cursor == 0:
+                return
+    
+    def _read_generation(self) -> int:
+        """Read the Redis generation counter of the cached entries."""
+        return int(self.redis_client.get(self.generation_key) or 0)
+    
+    def _sync_index(self, generation: int) -> None:
+        """Bring the in-process index in line with the Redis key set.
+        
+        Only embeddings of identifiers missing from the index are fetched,
+        one MGET per scanned page; rows of identifiers no longer in Redis are
+        dropped. Callers hold ``_index_lock``.
+        
+        Args:
+            generation: Generation counter read before the sync started; the
+                index reflects at least that state afterwards.
+        """
+        members: set[bytes] = set()
+        added = 0
+        for page in self._iter_member_pages():
+            members.update(page)
+            new_keys = [key for key in page if key not in self._index_positions]
+            if not new_keys:
+                continue
+            
+            embeddings = self.redis_client.mget([self._get_embedding_key(key) for key in new_keys])
+            for key, embedding_data in zip(new_keys, embeddings):
+                # Skip entries whose embedding expired or is missing
+                if not embedding_data:
+                    continue
+                
+                self._add_to_index(key, np.frombuffer(embedding_data, dtype=np.float32))
+                added += 1
+        
+        # Compact away rows whose entries were removed from Redis
+        if any(key not in members for key in self._index_keys):
+            kept = [key for key in self._index_keys if key in members]
+            rows = [self._index_positions[key] for key in kept]
+            self._index_matrix[:len(rows)] = self._index_matrix[rows]
+            self._index_keys = kept
+            self._index_positions = {key: row for row, key in enumerate(kept)}
+            self._index_size = len(kept)
+        
+        self._indexed_generation = generation
+        logger.debug(
+            "Synced cache similarity index: %s embeddings (%s added)", self._index_size, added
+        )
+    
+    def _add_to_index(self, identifier: bytes, embedding: np.ndarray) -> None:
+        """Insert or replace a single embedding in the in-process index.
+        
+        The matrix grows by doubling its capacity, so appends are amortized O(D).
+        Callers hold ``_index_lock``.
+        
+        Args:
+            identifier: Cache entry identifier.
+            embedding: The question embedding.
+        """
+        row = self._normalize(embedding)
+        position = self._index_positions.get(identifier)
+        if position is not None:
+            self._index_matrix[position] = row
+            return
+        
+        if self._index_matrix is None:
+            self._index_matrix = np.empty((16, row.shape[0]), dtype=np.float32)
+        elif self._index_size == self._index_matrix.shape[0]:
+            grown = np.empty((2 * self._index_size, row.shape[0]), dtype=np.float32)
+            grown[:self._index_size] = self._index_matrix
+            self._index_matrix = grown
+        
+        self._index_matrix[self._index_size] = row
+        self._index_positions[identifier] = self._index_size
+        self._index_keys.append(identifier)
+        self._index_size += 1
+    
+    def _remove_from_index(self, identifier: bytes) -> None:
+        """Drop a single embedding from the in-process index.
+        
+        The last row is moved into the freed slot, so removal is O(D).
+        Callers hold ``_index_lock``.
+        
+        Args:
+            identifier: Cache entry identifier.
+        """
+        position = self._index_positions.pop(identifier, None)
+        if position is None:
+            return
+        
+        last = self._index_size - 1
+        last_key = self._index_keys.pop()
+        if position != last:
+            self._index_matrix[position] = self._index_matrix[last]
+            self._index_keys[position] = last_key
+            self._index_positions[last_key] = position
+        self._index_size = last
     
-    def _compute_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
-        """Compute cosine similarity between two embeddings.
+    def _reset_index(self) -> None:
+        """Drop the in-process index so it is rebuilt on next lookup."""
+        with self._index_lock:
+            self._index_keys = []
+            self._index_positions = {}
+            self._index_matrix = None
+            self._index_size = 0
+            self._indexed_generation = None
+    
+    def _best_match(self, query_embedding: np.ndarray) -> tuple[bytes | None, float]:
+        """Find the cached question most similar to a query.
+        
+        Syncs the index first if the cached entries changed since the last
+        sync; only the sync and the scoring run under the index lock.
         
         Args:
-            embedding1: First embedding vector.
-            embedding2: Second embedding vector.
+            query_embedding: Embedding of the question.
             
         Returns:
-            Cosine similarity score (0-1).
+            Tuple of (identifier, similarity); the identifier is None when
+            the cache is empty.
+        """
+        generation = self._read_generation()
+        with self._index_lock:
+            if generation != self._indexed_generation:
+                self._sync_index(generation)
+            
+            if self._index_size == 0:
+                return None, 0.0
+            
+            # Rows are unit vectors, so one matrix-vector product yields the
+            # cosine similarity of the question against every cached question.
+            # Both operands are C-contiguous float32, so this is a single BLAS
+            # sgemv call (SIMD, multithreaded) with no dtype-promotion copy
+            similarities = self._index_matrix[:self._index_size] @ self._normalize(query_embedding)
+            best_index = int(similarities.argmax())
+            return self._index_keys[best_index], float(similarities[best_index])
+    
+    def _evict_expired(self, identifier: bytes) -> None:
+        """Forget an entry whose cached answer has expired in Redis.
+        
+        Args:
+            identifier: Cache entry identifier.
         """
-        # Normalize vectors
-        norm1 = np.linalg.norm(embedding1)
-        norm2 = np.linalg.norm(embedding2)
+        # A concurrent set() may have stored the question again meanwhile
+        if self.redis_client.exists(self._get_cache_key(identifier)):
+            return
+        if not self.redis_client.srem(self.all_keys_set, identifier):
+            # Another worker evicted it first; its generation bump resyncs us
+            return
+        self.redis_client.delete(self._get_embedding_key(identifier))
+        self._apply_change(self.redis_client.incr(self.generation_key), identifier, None)
+    
+    def _apply_change(self, generation: int, identifier: bytes, embedding: np.ndarray | None) -> None:
+        """Apply this worker's own change to the index without a full sync.
         
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
+        If the index was synced at the generation just before ``generation``,
+        this change is the only one since, so applying it keeps the index
+        current. Otherwise other changes happened too and the next lookup
+        syncs anyway.
         
-        # Compute cosine similarity
-        similarity = np.dot(embedding1, embedding2) / (norm1 * norm2)
-        return float(similarity)
+        Args:
+            generation: Generation returned by the INCR for this change.
+            identifier: Cache entry identifier.
+            embedding: The entry's embedding, or None if it was removed.
+        """
+        with self._index_lock:
+            if self._indexed_generation is None:
+                return
+            if embedding is None:
+                self._remove_from_index(identifier)
+            else:
+                self._add_to_index(identifier, embedding)
+            if self._indexed_generation == generation - 1:
+                self._indexed_generation = generation
     
-    def get(self, question: str) -> dict[str, Any] | None:
+    def get(self, question: str, query_embedding: np.ndarray | None = None) -> dict[str, Any] | None:
         """Retrieve cached answer for a similar question.
         
         Args:
             question: The question to look up.
+            query_embedding: Precomputed embedding of the question, if available.
             
         Returns:
             Dictionary with cached answer and metadata, or None if no match found.
         """
         try:
-            # Convert user's question into a 384-dimensional embedding vector (e.g., [0.12, 0.45, 0.67, ...])
-            # This allows us to compare semantic similarity, not just exact text matches
-            query_embedding_list = self.embedding_service.embed_text(question)
-            
-            # Convert Python list to NumPy array for faster mathematical operations
-            # Use float32 (32-bit) instead of float64 to save memory (half the size)
-            query_embedding = np.array(query_embedding_list, dtype=np.float32)
+            if query_embedding is None:
+                # Convert user's question into a 384-dimensional embedding vector (e.g., [0.12, 0.45, 0.67, ...])
+                # This allows us to compare semantic similarity, not just exact text matches
+                query_embedding = self.embedding_service.embed_query(question)
         except Exception as e:
             # If embedding generation fails (e.g., OpenAI API down), log error and treat as cache miss
-            logger.error(f"Failed to generate embedding for cache lookup: {str(e)}")
+            logger.error("Failed to generate embedding for cache lookup: %s", e)
             return None
         
         try:
-            # Retrieve all cached question identifiers from Redis set "disney_cache_keys"
-            # Returns a set like {b'abc123', b'def456', b'ghi789', ...}
-            cache_keys = self.redis_client.smembers(self.all_keys_set)
-            
-            # If cache is empty (no questions cached yet), return None immediately
-            if not cache_keys:
-                logger.debug("Cache is empty")
-                return None
-            
-            # Initialize tracking variables for finding the most similar cached question
-            # best_similarity: highest similarity score found so far (0.0 = no match yet)
-            best_similarity = 0.0
-            # best_match_key: identifier of the cached question with highest similarity
-            best_match_key = None
-            
-            # Loop through each cached question to find the most similar one
-            for key in cache_keys:
-                # Redis returns bytes (b'abc123'), convert to string ('abc123')
-                key_str = key.decode('utf-8') if isinstance(key, bytes) else key
-                
-                # Generate Redis key for this cached question's embedding (e.g., 'disney_embedding:abc123')
-                embedding_key = self._get_embedding_key(key_str)
+            while True:
+                best_match_key, best_similarity = self._best_match(query_embedding)
                 
-                # Fetch the cached embedding vector from Redis (stored as JSON string)
-                embedding_data = self.redis_client.get(embedding_key)
+                # If cache is empty (no questions cached yet), return None immediately
+                if best_match_key is None:
+                    logger.debug("Cache is empty")
+                    return None
                 
-                # Skip this cache entry if embedding is missing (expired or corrupted)
-                if not embedding_data:
-                    continue
+                # Check if we found a match that's similar enough (≥ 0.95 by default)
+                if best_similarity < self.similarity_threshold:
+                    break
                 
-                # Parse JSON string to Python list, then convert to NumPy array
-                # Example: "[0.15, 0.42, 0.70, ...]" -> [0.15, 0.42, 0.70, ...] -> np.array
-                cached_embedding = np.array(json.loads(embedding_data), dtype=np.float32)
-                
-                # Calculate cosine similarity between user's question and this cached question
-                # Returns a score between 0.0 (completely different) and 1.0 (identical)
-                similarity = self._compute_similarity(query_embedding, cached_embedding)
-                
-                # If this cached question is MORE similar than previous best, update our tracking
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_match_key = key_str
-            
-            # Check if we found a match that's similar enough (≥ 0.95 by default)
-            # Also verify we actually found a match (best_match_key is not None)
-            if best_match_key and best_similarity >= self.similarity_threshold:
                 # Generate Redis key for the actual cached answer data (e.g., 'disney_cache:ghi789')
                 cache_key = self._get_cache_key(best_match_key)
                 
                 # Fetch the cached answer data from Redis (contains question, answer, metadata)
                 cached_data = self.redis_client.get(cache_key)
                 
-                # Verify data exists (could have expired between similarity check and retrieval)
-                if cached_data:
-                    # Parse JSON to dictionary containing question, answer, num_reviews_used, timestamp
-                    entry_dict = json.loads(cached_data)
-                    
-                    # Log successful cache hit with similarity score and both questions for debugging
-                    logger.info(
-                        f"Cache HIT - similarity: {best_similarity:.4f}, "
-                        f"original: '{entry_dict['question']}', query: '{question}'"
-                    )
-                    
-                    # Return cached answer with metadata about the cache hit
-                    return {
-                        "question": question,  # The user's new question
-                        "answer": entry_dict["answer"],  # The cached answer (reused from similar question)
-                        "num_reviews_used": entry_dict["num_reviews_used"],  # How many reviews were used
-                        "cached": True,  # Flag indicating this is from cache (not freshly generated)
-                        "cache_similarity": best_similarity,  # How similar the match was (e.g., 0.97)
-                        "original_question": entry_dict["question"]  # The original cached question
-                    }
+                # The entry may have expired since it was indexed; drop it so it
+                # can't shadow a live match, and look again
+                if not cached_data:
+                    self._evict_expired(best_match_key)
+                    continue
+                
+                # Parse JSON to dictionary containing question, answer, num_reviews_used, timestamp
+                entry_dict = orjson.loads(cached_data)
+                
+                # Log successful cache hit with similarity score and both questions for debugging
+                logger.info(
+                    "Cache HIT - similarity: %.4f, original: '%s', query: '%s'",
+                    best_similarity,
+                    entry_dict["question"],
+                    question,
+                )
+                
+                # Return cached answer with metadata about the cache hit
+                return {
+                    "question": question,  # The user's new question
+                    "answer": entry_dict["answer"],  # The cached answer (reused from similar question)
+                    "num_reviews_used": entry_dict["num_reviews_used"],  # How many reviews were used
+                    "cached": True,  # Flag indicating this is from cache (not freshly generated)
+                    "cache_similarity": best_similarity,  # How similar the match was (e.g., 0.97)
+                    "original_question": entry_dict["question"]  # The original cached question
+                }
             
             # No sufficiently similar question found - log best similarity and threshold
-            logger.debug(f"Cache MISS - best similarity: {best_similarity:.4f}, threshold: {self.similarity_threshold}")
+            logger.debug("Cache MISS - best similarity: %.4f, threshold: %s", best_similarity, self.similarity_threshold)
             return None
             
         except RedisError as e:
             # If Redis fails (connection timeout, server down, etc.), log error and treat as cache miss
             # This allows the system to continue functioning without cache (degraded but operational)
-            logger.error(f"Redis error during cache lookup: {str(e)}")
+            logger.error("Redis error during cache lookup: %s", e)
             return None
     
-    def set(self, question: str, answer: str, num_reviews_used: int) -> None:
+    def set(
+        self,
+        question: str,
+        answer: str,
+        num_reviews_used: int,
+        query_embedding: np.ndarray | None = None
+    ) -> None:
         """Store a question-answer pair in the cache.
         
         Args:
             question: The question asked.
             answer: The answer generated.
             num_reviews_used: Number of reviews used to generate the answer.
+            query_embedding: Precomputed embedding of the question, if available.
         """
         try:
-            # Generate embedding for the question
-            embedding = self.embedding_service.embed_text(question)
+            # Generate embedding for the question unless the caller already did
+            embedding = query_embedding
+            if embedding is None:
+                embedding = self.embedding_service.embed_query(question)
             
             # Create cache entry
             entry = CacheEntry(
@@ -294,62 +504,62 @@ class QueryCacheService:
             
             # Use a hash of the question as the identifier
             import hashlib
-            identifier = hashlib.sha256(question.encode()).hexdigest()[:16]
+            identifier = hashlib.sha256(question.encode()).hexdigest()[:16].encode()
             
             # Store cache entry
             cache_key = self._get_cache_key(identifier)
-            entry_data = {
-                "question": entry.question,
-                "answer": entry.answer,
-                "num_reviews_used": entry.num_reviews_used,
-                "timestamp": entry.timestamp.isoformat()
-            }
             self.redis_client.setex(
                 cache_key,
                 self.ttl_seconds,
-                json.dumps(entry_data)
+                orjson.dumps(entry.to_dict())
             )
             
-            # Store embedding separately (also with TTL)
+            # Store embedding separately as raw float32 bytes (also with TTL)
             embedding_key = self._get_embedding_key(identifier)
             self.redis_client.setex(
                 embedding_key,
                 self.ttl_seconds,
-                json.dumps(entry.embedding.tolist())
+                entry.embedding_bytes()
             )
             
-            # Add to set of all keys
+            # Add to set of all keys and announce the change to other workers
             self.redis_client.sadd(self.all_keys_set, identifier)
+            generation = self.redis_client.incr(self.generation_key)
+            
+            # Keep the in-process index in sync without a full rebuild
+            self._apply_change(generation, identifier, entry.embedding)
             
-            logger.info(f"Added to cache: '{question}' (key: {identifier})")
+            logger.info("Added to cache: '%s' (key: %s)", question, identifier.decode())
             
         except RedisError as e:
-            logger.error(f"Redis error during cache set: {str(e)}")
+            logger.error("Redis error during cache set: %s", e)
         except Exception as e:
-            logger.error(f"Failed to add to cache: {str(e)}")
+            logger.error("Failed to add to cache: %s", e)
     
     def clear(self) -> None:
         """Clear all cache entries."""
         try:
-            # Get all cache keys
-            cache_keys = self.redis_client.smembers(self.all_keys_set)
+            total_entries = self.redis_client.scard(self.all_keys_set)
             
-            if cache_keys:
-                # Delete all cache entries and embeddings
-                for key in cache_keys:
-                    key_str = key.decode('utf-8') if isinstance(key, bytes) else key
-                    self.redis_client.delete(self._get_cache_key(key_str))
-                    self.redis_client.delete(self._get_embedding_key(key_str))
-                
-                # Clear the set of all keys
+            if total_entries:
+                # Delete cache entries and embeddings one scanned page per call,
+                # then the key set itself
+                for page in self._iter_member_pages():
+                    redis_keys = []
+                    for key in page:
+                        redis_keys.append(self._get_cache_key(key))
+                        redis_keys.append(self._get_embedding_key(key))
+                    self.redis_client.delete(*redis_keys)
                 self.redis_client.delete(self.all_keys_set)
+                self.redis_client.incr(self.generation_key)
+                self._reset_index()
                 
-                logger.info(f"Cleared {len(cache_keys)} cache entries")
+                logger.info("Cleared %s cache entries", total_entries)
             else:
                 logger.info("Cache was already empty")
                 
         except RedisError as e:
-            logger.error(f"Redis error during cache clear: {str(e)}")
+            logger.error("Redis error during cache clear: %s", e)
     
     def get_stats(self) -> dict[str, Any]:
         """Get cache statistics.
@@ -358,9 +568,7 @@ class QueryCacheService:
             Dictionary with cache statistics.
         """
         try:
-            # Get all cache keys
-            cache_keys = self.redis_client.smembers(self.all_keys_set)
-            total_entries = len(cache_keys)
+            total_entries = self.redis_client.scard(self.all_keys_set)
             
             # Get memory info
             info = self.redis_client.info('memory')
@@ -370,15 +578,17 @@ class QueryCacheService:
             oldest_entry = None
             newest_entry = None
             
-            if cache_keys:
+            if total_entries:
                 timestamps = []
-                for key in cache_keys:
-                    key_str = key.decode('utf-8') if isinstance(key, bytes) else key
-                    cache_key = self._get_cache_key(key_str)
-                    cached_data = self.redis_client.get(cache_key)
-                    
+                # Fetch entries one scanned page per MGET round trip
+                entries = (
+                    cached_data
+                    for page in self._iter_member_pages()
+                    for cached_data in self.redis_client.mget([self._get_cache_key(key) for key in page])
+                )
+                for cached_data in entries:
                     if cached_data:
-                        entry_dict = json.loads(cached_data)
+                        entry_dict = orjson.loads(cached_data)
                         timestamps.append(datetime.fromisoformat(entry_dict['timestamp']))
                 
                 if timestamps:
@@ -397,12 +607,29 @@ class QueryCacheService:
             }
             
         except RedisError as e:
-            logger.error(f"Redis error during get_stats: {str(e)}")
+            logger.error("Redis error during get_stats: %s", e)
             return {
                 "total_entries": 0,
                 "error": str(e)
             }
     
+    def size(self) -> int:
+        """Get the number of cache entries.
+        
+        Reuses the size of the in-process index as of the latest lookup or
+        write, so the request path does not pay an extra Redis round trip.
+        
+        Returns:
+            Number of cached questions.
+        """
+        with self._index_lock:
+            if self._indexed_generation is not None:
+                return self._index_size
+        try:
+            return self.redis_client.scard(self.all_keys_set)
+        except RedisError:
+            return 0
+    
     @property
     def cache(self) -> list[Any]:
         """Get all cache entries (for compatibility with metrics).
@@ -411,8 +638,7 @@ class QueryCacheService:
             List representation of cache size.
         """
         try:
-            cache_keys = self.redis_client.smembers(self.all_keys_set)
             # Return a list with the right length for metrics
-            return [None] * len(cache_keys)
+            return [None] * self.redis_client.scard(self.all_keys_set)
         except RedisError:
             return []
@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
+
+from disney_customers_feedback_ex.core.settings import SETTINGS
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
@@ -11,29 +20,114 @@ logger = logging.getLogger(__name__)
 class EmbeddingService:
     """Service for generating text embeddings."""
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2") -> None:
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        max_batch_size: int = 32,
+        max_batch_delay: float = 0.005,
+        query_cache_size: int = 512
+    ) -> None:
         """Initialize the embedding service.
         
         Args:
             model_name: The sentence transformer model to use.
+            max_batch_size: Maximum number of queries encoded together by the
+                micro-batcher.
+            max_batch_delay: Seconds the micro-batcher waits for more queries
+                after the first one arrives.
+            query_cache_size: Number of recent query embeddings kept for
+                repeated queries (0 disables the cache).
         """
         self.model_name = model_name
         self.model: SentenceTransformer | None = None
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay = max_batch_delay
+        
+        # Micro-batcher state, created by start_batching() on the event loop
+        self._queue: asyncio.Queue[tuple[str, asyncio.Future[np.ndarray]]] | None = None
+        self._batch_task: asyncio.Task[None] | None = None
+        
+        # Recent query embeddings (read-only arrays) in LRU order; queries are
+        # embedded both on the event loop and in worker threads
+        self.query_cache_size = query_cache_size
+        self._query_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        
+    def load_model(self, warm_up: bool = True) -> None:
+        """Load the sentence transformer model.
+        
+        On a CUDA device the weights are cast to FP16, halving the memory
+        traffic of every encode. On CPU the backend is configurable through
+        ``EMBEDDING_BACKEND`` (``torch`` by default, ``onnx`` with
+        ``optimum[onnxruntime]`` or ``openvino`` with ``optimum[openvino]``).
+        ``EMBEDDING_MODEL_FILE`` selects a specific exported file for those
+        backends, e.g. one of the int8-quantized ONNX models.
+        
+        With ``EMBEDDING_COMPILE=1`` the torch encoder is wrapped in
+        ``torch.compile``. The model is warmed up with one full batch so lazy
+        initialization, kernel selection and compilation happen at startup
+        rather than on the first request.
+        
+        Args:
+            warm_up: Whether to run the warm-up batch now. Skip it when the
+                process is about to fork, since torch thread pools do not
+                survive ``fork``, and call ``warm_up()`` in each child instead.
+        """
+        # torch and sentence-transformers are imported here rather than at
+        # module import so processes that never load the model stay light
+        import torch
+        from sentence_transformers import SentenceTransformer
+        
+        logger.info("Loading embedding model: %s", self.model_name)
+        if torch.cuda.is_available():
+            self.model = SentenceTransformer(self.model_name, device="cuda")
+            self.model.half()
+            logger.info("Embedding model loaded on CUDA with FP16 weights")
+        else:
+            model_kwargs = None
+            if SETTINGS.embedding_backend != "torch" and SETTINGS.embedding_model_file:
+                model_kwargs = {"file_name": SETTINGS.embedding_model_file}
+            self.model = SentenceTransformer(
+                self.model_name,
+                device="cpu",
+                backend=SETTINGS.embedding_backend,
+                model_kwargs=model_kwargs
+            )
+            logger.info("Embedding model loaded on CPU (%s backend)", SETTINGS.embedding_backend)
+        
+        if SETTINGS.embedding_compile and SETTINGS.embedding_backend == "torch":
+            # Sequence lengths vary per batch, so compile for dynamic shapes;
+            # CUDA graphs ("reduce-overhead") only pay off on the GPU
+            transformer = self.model[0]
+            transformer.auto_model = torch.compile(
+                transformer.auto_model,
+                mode="reduce-overhead" if torch.cuda.is_available() else "default",
+                dynamic=True
+            )
+            logger.info("Embedding encoder wrapped with torch.compile")
         
-    def load_model(self) -> None:
-        """Load the sentence transformer model."""
-        logger.info(f"Loading embedding model: {self.model_name}")
-        self.model = SentenceTransformer(self.model_name)
-        logger.info("Embedding model loaded successfully")
+        if warm_up:
+            self.warm_up()
+    
+    def warm_up(self) -> None:
+        """Encode one full dummy batch to trigger lazy initialization.
+        
+        Runs in every worker process, so the torch thread pool is also sized
+        here: with ``WEB_CONCURRENCY`` workers on the machine, each one gets
+        its share of the cores instead of all of them.
+        """
+        self._limit_threads()
+        self._encode(["warmup"] * self.max_batch_size)
+        logger.info("Embedding model warmed up")
         
-    def embed_text(self, text: str) -> list[float]:
+    def embed_text(self, text: str) -> np.ndarray:
         """Generate embeddings for a single text.
         
         Args:
             text: The text to embed.
             
         Returns:
-            List of float values representing the embedding.
+            L2-normalized 1-D float32 embedding vector.
         """
         if self.model is None:
             raise ValueError("Model not loaded. Call load_model() first.")
@@ -44,17 +138,199 @@ class EmbeddingService:
             clean_text = "No content"
             
         # Generate embedding
-        embedding = self.model.encode([clean_text])[0]
-        return embedding.tolist()
+        return self._encode([clean_text])[0]
+    
+    def embed_query(self, text: str) -> np.ndarray:
+        """Generate the embedding for a query as a float32 array.
+        
+        Computed once per request and shared by the cache lookup, the cache
+        write and the vector search.
+        
+        Args:
+            text: The query text.
+            
+        Returns:
+            L2-normalized 1-D float32 embedding vector.
+        """
+        if self.model is None:
+            raise ValueError("Model not loaded. Call load_model() first.")
+            
+        clean_text = str(text).strip() or "No content"
+        embedding = self._cached_query(clean_text)
+        if embedding is None:
+            embedding = self._remember_query(clean_text, self._encode([clean_text])[0])
+        return embedding
+    
+    def _cached_query(self, clean_text: str) -> np.ndarray | None:
+        """Get a cached query embedding, marking it recently used."""
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(clean_text)
+            if embedding is not None:
+                self._query_cache.move_to_end(clean_text)
+            return embedding
+    
+    def _remember_query(self, clean_text: str, embedding: np.ndarray) -> np.ndarray:
+        """Cache a query embedding as a read-only array and return it."""
+        if self.query_cache_size <= 0:
+            return embedding
+        embedding.setflags(write=False)
+        with self._query_cache_lock:
+            self._query_cache[clean_text] = embedding
+            self._query_cache.move_to_end(clean_text)
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        return embedding
+        
+    def start_batching(self) -> None:
+        """Start the micro-batcher serving ``embed_query_async``.
+        
+        Must be called from the running event loop after the model is loaded.
+        """
+        if self._batch_task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._batch_task = asyncio.create_task(self._run_batches(), name="embedding-batcher")
+        logger.info(
+            "Embedding micro-batcher started (max %s queries, %.1f ms window)",
+            self.max_batch_size,
+            self.max_batch_delay * 1000
+        )
+    
+    async def stop_batching(self) -> None:
+        """Stop the micro-batcher and fail any queries still waiting."""
+        if self._batch_task is None:
+            return
+        self._batch_task.cancel()
+        try:
+            await self._batch_task
+        except asyncio.CancelledError:
+            pass
         
-    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding service is shutting down"))
+        self._batch_task = None
+        self._queue = None
+    
+    async def embed_query_async(self, text: str) -> np.ndarray:
+        """Generate the embedding for a query, batched with concurrent queries.
+        
+        Falls back to encoding the query alone in a worker thread when the
+        micro-batcher is not running.
+        
+        Args:
+            text: The query text.
+            
+        Returns:
+            L2-normalized 1-D float32 embedding vector.
+        """
+        clean_text = str(text).strip() or "No content"
+        embedding = self._cached_query(clean_text)
+        if embedding is not None:
+            return embedding
+        
+        if self._queue is None:
+            return await asyncio.to_thread(self.embed_query, text)
+        
+        future: asyncio.Future[np.ndarray] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((clean_text, future))
+        return self._remember_query(clean_text, await future)
+    
+    async def _run_batches(self) -> None:
+        """Collect queued queries into batches and encode each batch at once.
+        
+        A batch closes when ``max_batch_size`` queries are queued or
+        ``max_batch_delay`` has passed since its first query arrived.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: list[tuple[str, asyncio.Future[np.ndarray]]] = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.max_batch_delay
+                while len(batch) < self.max_batch_size:
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except TimeoutError:
+                        break
+                
+                embeddings = await asyncio.to_thread(self._encode, [text for text, _ in batch])
+            except asyncio.CancelledError:
+                # Queries already taken off the queue would otherwise wait forever
+                self._fail_batch(batch, RuntimeError("Embedding service is shutting down"))
+                raise
+            except Exception as e:
+                self._fail_batch(batch, e)
+                continue
+            
+            # Callers that gave up (e.g. cancelled requests) already have done futures
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+    
+    @staticmethod
+    def _fail_batch(batch: list[tuple[str, asyncio.Future[np.ndarray]]], error: BaseException) -> None:
+        """Fail every query in a batch that is still waiting for its embedding."""
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+    
+    @staticmethod
+    def _limit_threads() -> None:
+        """Cap torch intra-op threads at this worker's share of the CPU cores."""
+        if SETTINGS.web_concurrency <= 1:
+            return
+        
+        import torch
+        
+        threads = max(1, (os.cpu_count() or 1) // SETTINGS.web_concurrency)
+        torch.set_num_threads(threads)
+        logger.info(
+            "Embedding encodes use %s torch threads (%s workers)", threads, SETTINGS.web_concurrency
+        )
+    
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        """Encode cleaned texts in one model call.
+        
+        Embeddings are L2-normalized by the model, so cosine similarity
+        between them is a plain dot product.
+        
+        Args:
+            texts: Non-empty texts.
+            
+        Returns:
+            2-D float32 array with one embedding per text.
+        """
+        if self.model is None:
+            raise ValueError("Model not loaded. Call load_model() first.")
+        
+        import torch
+        
+        # No autograd bookkeeping (version counters, grad metadata) is needed
+        with torch.inference_mode():
+            embeddings = self.model.encode(
+                texts,
+                batch_size=self.max_batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+        return embeddings.astype(np.float32, copy=False)
+        
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
         """Generate embeddings for multiple texts.
         
         Args:
             texts: List of texts to embed.
             
         Returns:
-            List of embeddings, each as a list of floats.
+            L2-normalized float32 array of shape (len(texts), D).
         """
         if self.model is None:
             raise ValueError("Model not loaded. Call load_model() first.")
@@ -67,10 +343,17 @@ class EmbeddingService:
                 clean_text = "No content"
             clean_texts.append(clean_text)
             
-        logger.info(f"Generating embeddings for {len(clean_texts)} texts")
+        logger.info("Generating embeddings for %s texts", len(clean_texts))
+        
+        import torch
         
         # Generate embeddings in batch
-        embeddings = self.model.encode(clean_texts)
+        with torch.inference_mode():
+            embeddings = self.model.encode(
+                clean_texts,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            ).astype(np.float32, copy=False)
         
-        logger.info(f"Generated {len(embeddings)} embeddings")
-        return [embedding.tolist() for embedding in embeddings]
\ No newline at end of file
+        logger.info("Generated %s embeddings", len(embeddings))
+        return embeddings
\ No newline at end of file
@@ -1,26 +1,154 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import importlib.util
 import logging
-import os
+import re
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable
+from functools import lru_cache
 
-from openai import OpenAI
+from typing import TYPE_CHECKING
+
+import httpx
+import orjson
+
+from disney_customers_feedback_ex.core.settings import SETTINGS
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 logger = logging.getLogger(__name__)
 
+# The request prefix is kept byte-identical across calls (system message first,
+# then the fixed head of the user message) so provider-side prompt caching can
+# reuse it; everything request-specific comes after it
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that answers questions about Disney parks "
+    "based on customer reviews. Use only the provided reviews to answer. "
+    "If the reviews don't contain enough information, say so."
+)
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+# Fixed pieces of the user message around the review context and question
+_USER_PROMPT_HEAD = "Based on these customer reviews:\n\n"
+_USER_PROMPT_QUESTION = "\n\nQuestion: "
+_USER_PROMPT_TAIL = "\n\nPlease provide a concise answer based on the reviews above."
+# Closing instructions when several questions share one review context
+_MULTI_QUESTION_HEAD = "\n\nQuestions:\n"
+_MULTI_QUESTION_TAIL = (
+    "\n\nAnswer each question concisely based on the reviews above. Respond "
+    'with a JSON object {"answers": [...]} holding one answer string per '
+    "question, in the same order."
+)
+# Rough characters-per-token ratio of English text, for context budgeting
+_CHARS_PER_TOKEN = 4
+# Routes requests sharing the prefix to the same prompt cache
+_PROMPT_CACHE_KEY = "disney-reviews-qa"
+# Answers kept for byte-identical prompts (the semantic tier for paraphrased
+# questions is QueryCacheService, in front of retrieval)
+_ANSWER_CACHE_SIZE = 1024
+
+# Query complexity signals
+_COMPARATIVE_WORDS = frozenset({"compare", "versus", "vs", "better", "worse", "difference", "similar"})
+_ANALYTICAL_WORDS = frozenset({"why", "how", "analyze", "trend", "pattern", "correlation"})
+_BRANCHES = ("california", "hong kong", "paris")
+_WORD_PATTERN = re.compile(r"[a-z]+")
+
+
+# Process-wide OpenAI client, shared by every LLMService instance
+_client: AsyncOpenAI | None = None
+
+
+def _get_client(api_key: str) -> AsyncOpenAI:
+    """Get the shared OpenAI client, creating it on first use.
+    
+    Args:
+        api_key: OpenAI API key.
+        
+    Returns:
+        The process-wide client.
+    """
+    global _client
+    if _client is None:
+        # Deferred so the openai SDK is only loaded when a service is created
+        from openai import AsyncOpenAI
+        
+        # Async client so LLM round trips don't block the event loop; the
+        # pooled keep-alive (HTTP/2) connections are shared by concurrent
+        # requests for the lifetime of the app, so TLS handshakes are rare.
+        # The SDK retries 408/409/429/5xx, timeouts and connection errors with
+        # jittered exponential backoff, honoring the retry-after headers
+        _client = AsyncOpenAI(
+            api_key=api_key,
+            max_retries=5,
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=500, max_keepalive_connections=200),
+                timeout=httpx.Timeout(60.0, connect=5.0),
+                # HTTP/2 needs the h2 package (httpx[http2]); without it
+                # httpx raises at construction, so fall back to HTTP/1.1
+                http2=importlib.util.find_spec("h2") is not None,
+            )
+        )
+    return _client
+
+
+@lru_cache(maxsize=4096)
+def _render_review(
+    branch: str,
+    rating: str,
+    year_month: str,
+    reviewer_location: str,
+    review_text: str
+) -> str:
+    """Render one review's context block (without its position header).
+    
+    Popular questions retrieve the same reviews over and over, so each block
+    is formatted once and reused.
+    """
+    return (
+        f"Park: {branch}\n"
+        f"Rating: {rating}\n"
+        f"Date: {year_month}\n"
+        f"Reviewer Location: {reviewer_location}\n"
+        f"Review: {review_text}\n"
+    )
+
 
 class LLMService:
     """Service for querying the LLM with context."""
     
     def __init__(self) -> None:
         """Initialize the LLM service."""
-        api_key = os.getenv("OPENAI_API_KEY")
+        api_key = SETTINGS.openai_api_key
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
-        self.client = OpenAI(api_key=api_key)
+        
+        self.client = _get_client(api_key)
+        # Caps in-flight calls (retries included) so bursts queue here instead
+        # of tripping the provider's rate limit
+        self._semaphore = asyncio.Semaphore(SETTINGS.openai_max_concurrency)
+        # Exact-match answer cache: prompt digest -> answer, in LRU order
+        self._answers: OrderedDict[bytes, tuple[str, int]] = OrderedDict()
+    
+    async def close(self) -> None:
+        """Close the shared HTTP connection pool.
+        
+        Services created afterwards get a fresh client.
+        """
+        global _client
+        if _client is self.client:
+            _client = None
+        await self.client.close()
     
-    def estimate_query_complexity(self, question: str) -> tuple[float, str]:
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def estimate_query_complexity(question: str) -> tuple[float, str]:
         """Estimate the complexity of a user query.
         
+        Results are memoized, since the estimate depends only on the text.
+        
         Complexity is based on:
         - Question length
         - Number of clauses/entities
@@ -45,18 +173,15 @@ class LLMService:
             score += 0.1
         
         # Comparative/analytical keywords (0-0.3)
-        comparative_words = ["compare", "versus", "vs", "better", "worse", "difference", "similar"]
-        analytical_words = ["why", "how", "analyze", "trend", "pattern", "correlation"]
-        
         question_lower = question.lower()
-        if any(word in question_lower for word in comparative_words):
+        tokens = set(_WORD_PATTERN.findall(question_lower))
+        if not _COMPARATIVE_WORDS.isdisjoint(tokens):
             score += 0.2
-        if any(word in question_lower for word in analytical_words):
+        if not _ANALYTICAL_WORDS.isdisjoint(tokens):
             score += 0.3
         
-        # Multiple entities/filters (0-0.3)
-        branches = ["california", "hong kong", "paris"]
-        branch_count = sum(1 for branch in branches if branch in question_lower)
+        # Multiple entities/filters (0-0.3); substring match for "hong kong"
+        branch_count = sum(branch in question_lower for branch in _BRANCHES)
         if branch_count > 1:
             score += 0.3
         elif branch_count == 1:
@@ -77,80 +202,278 @@ class LLMService:
         
         return min(score, 1.0), complexity_type
         
-    def query_with_context(
+    async def query_with_context(
         self,
         question: str,
-        reviews: list[dict[str, str]]
+        reviews: list[dict[str, str]],
+        max_context_tokens: int | None = None
     ) -> str:
         """Query the LLM with question and review context.
         
         Args:
             question: The user's question.
-            reviews: List of relevant review dictionaries.
+            reviews: List of relevant review dictionaries, most relevant first.
+            max_context_tokens: Approximate token budget for the review context
+                (defaults to ``LLM_MAX_CONTEXT_TOKENS``).
             
         Returns:
             The LLM's answer based on the reviews.
         """
-        # Build context from reviews
-        context = self._build_context(reviews)
+        answer, _ = await self.answer_with_context(question, reviews, max_context_tokens)
+        return answer
+    
+    async def answer_with_context(
+        self,
+        question: str,
+        reviews: list[dict[str, str]],
+        max_context_tokens: int | None = None
+    ) -> tuple[str, int]:
+        """Query the LLM like ``query_with_context``, also reporting the context used.
+        
+        Args:
+            question: The user's question.
+            reviews: List of relevant review dictionaries, most relevant first.
+            max_context_tokens: Approximate token budget for the review context
+                (defaults to ``LLM_MAX_CONTEXT_TOKENS``).
+            
+        Returns:
+            Tuple of (answer, number of reviews that fit in the prompt).
+        """
+        user_prompt, review_count = self._build_user_prompt(question, reviews, max_context_tokens)
+        key = hashlib.sha256(user_prompt.encode()).digest()
+        cached = self._answers.get(key)
+        if cached is not None:
+            self._answers.move_to_end(key)
+            logger.info("LLM answer served from exact-match cache")
+            return cached
         
-        logger.info(f"Querying LLM with {len(reviews)} reviews as context")
+        parts = [part async for part in self._stream(user_prompt, review_count)]
+        answer = "".join(parts)
+        logger.info("LLM response generated successfully")
         
-        # Create the prompt
-        system_prompt = (
-            "You are a helpful assistant that answers questions about Disney parks "
-            "based on customer reviews. Use only the provided reviews to answer. "
-            "If the reviews don't contain enough information, say so."
-        )
+        self._answers[key] = (answer, review_count)
+        if len(self._answers) > _ANSWER_CACHE_SIZE:
+            self._answers.popitem(last=False)
+        return answer, review_count
+    
+    async def stream_answer(
+        self,
+        question: str,
+        reviews: list[dict[str, str]],
+        max_context_tokens: int | None = None
+    ) -> AsyncIterator[str]:
+        """Stream the LLM's answer as it is generated.
+        
+        The first piece arrives after prompt processing rather than after the
+        whole completion, so callers can start rendering early.
+        
+        Args:
+            question: The user's question.
+            reviews: List of relevant review dictionaries, most relevant first.
+            max_context_tokens: Approximate token budget for the review context
+                (defaults to ``LLM_MAX_CONTEXT_TOKENS``).
+            
+        Yields:
+            Successive fragments of the answer.
+        """
+        user_prompt, review_count = self._build_user_prompt(question, reviews, max_context_tokens)
+        async for part in self._stream(user_prompt, review_count):
+            yield part
+    
+    async def _stream(self, user_prompt: str, review_count: int) -> AsyncIterator[str]:
+        """Stream the completion for a prepared user prompt."""
+        logger.info("Querying LLM with %s reviews as context", review_count)
         
-        user_prompt = f"""Based on these customer reviews:
-
-{context}
-
-Question: {question}
-
-Please provide a concise answer based on the reviews above."""
-
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
+            # The slot is held until the stream is fully consumed
+            async with self._semaphore:
+                stream = await self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        _SYSTEM_MESSAGE,
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.7,
+                    max_tokens=500,
+                    prompt_cache_key=_PROMPT_CACHE_KEY,
+                    stream=True
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            
+        except Exception as e:
+            logger.error("Error querying LLM: %s", e)
+            raise
             
-            answer = response.choices[0].message.content or ""
-            logger.info("LLM response generated successfully")
-            return answer
+    async def batch_query(
+        self,
+        items: list[tuple[str, list[dict[str, str]]]]
+    ) -> list[str]:
+        """Answer several questions concurrently.
+        
+        The calls share the pooled client and run in parallel, so the batch
+        takes about as long as its slowest question.
+        
+        Args:
+            items: (question, reviews) pairs.
             
+        Returns:
+            The answers, in the same order as ``items``.
+        """
+        return await asyncio.gather(
+            *(self.query_with_context(question, reviews) for question, reviews in items)
+        )
+    
+    async def query_many_with_context(
+        self,
+        questions: list[str],
+        reviews: list[dict[str, str]]
+    ) -> list[str]:
+        """Answer several questions about the same reviews in one LLM call.
+        
+        The shared review context is sent and processed once instead of once
+        per question. Falls back to one call per question if the reply can't
+        be parsed into exactly one answer per question.
+        
+        Args:
+            questions: Questions to answer.
+            reviews: List of relevant review dictionaries, most relevant first.
+            
+        Returns:
+            The answers, in the same order as ``questions``.
+        """
+        if len(questions) <= 1:
+            return [await self.query_with_context(question, reviews) for question in questions]
+        
+        context, review_count = self._build_context(reviews)
+        user_prompt = "".join((
+            _USER_PROMPT_HEAD,
+            context,
+            _MULTI_QUESTION_HEAD,
+            "\n".join(f"{i}. {question}" for i, question in enumerate(questions, 1)),
+            _MULTI_QUESTION_TAIL
+        ))
+        
+        logger.info("Querying LLM with %s questions over %s reviews", len(questions), review_count)
+        
+        try:
+            async with self._semaphore:
+                response = await self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        _SYSTEM_MESSAGE,
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.7,
+                    max_tokens=500 * len(questions),
+                    prompt_cache_key=_PROMPT_CACHE_KEY,
+                    response_format={"type": "json_object"}
+                )
         except Exception as e:
-            logger.error(f"Error querying LLM: {str(e)}")
+            logger.error("Error querying LLM: %s", e)
             raise
+        
+        try:
+            answers = orjson.loads(response.choices[0].message.content or "")["answers"]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            answers = None
+        if not isinstance(answers, list) or len(answers) != len(questions):
+            logger.warning("Could not parse a combined answer, querying questions separately")
+            return await self.batch_query([(question, reviews) for question in questions])
+        
+        return [str(answer) for answer in answers]
+    
+    async def answer_questions(
+        self,
+        questions: list[str],
+        search: Callable[[str], list[dict[str, str]]]
+    ) -> list[str]:
+        """Retrieve context for and answer several questions, pipelined.
+        
+        Each question's retrieval runs in a worker thread as soon as it is
+        scheduled, so CPU-bound searches overlap with other questions' LLM
+        calls instead of all retrieval finishing before the first call.
+        
+        Args:
+            questions: Questions to answer.
+            search: Blocking retrieval function returning the reviews for a question.
             
-    def _build_context(self, reviews: list[dict[str, str]]) -> str:
-        """Build context string from reviews.
+        Returns:
+            The answers, in the same order as ``questions``.
+        """
+        async def answer(question: str) -> str:
+            reviews = await asyncio.to_thread(search, question)
+            return await self.query_with_context(question, reviews)
+        
+        return await asyncio.gather(*(answer(question) for question in questions))
+    
+    def _build_user_prompt(
+        self,
+        question: str,
+        reviews: list[dict[str, str]],
+        max_context_tokens: int | None = None
+    ) -> tuple[str, int]:
+        """Build the user message for a question and its review context.
         
         Args:
+            question: The user's question.
             reviews: List of review dictionaries.
+            max_context_tokens: Approximate token budget for the review context.
             
         Returns:
-            Formatted context string.
+            Tuple of (user prompt, number of reviews included in it).
         """
-        if not reviews:
-            return "No relevant reviews found."
+        context, review_count = self._build_context(reviews, max_context_tokens)
+        return "".join((
+            _USER_PROMPT_HEAD,
+            context,
+            _USER_PROMPT_QUESTION,
+            question,
+            _USER_PROMPT_TAIL
+        )), review_count
+    
+    def _build_context(
+        self,
+        reviews: list[dict[str, str]],
+        max_context_tokens: int | None = None
+    ) -> tuple[str, int]:
+        """Build context string from reviews.
+        
+        Reviews are taken in order until the approximate token budget is
+        spent; the first review is always included. Prompt processing time
+        and cost grow with every context token, so low-ranked reviews past
+        the budget are dropped.
+        
+        Args:
+            reviews: List of review dictionaries, most relevant first.
+            max_context_tokens: Approximate token budget (defaults to
+                ``LLM_MAX_CONTEXT_TOKENS``; 0 disables the budget).
             
+        Returns:
+            Tuple of (formatted context string, number of reviews included).
+        """
+        if not reviews:
+            return "No relevant reviews found.", 0
+        
+        if max_context_tokens is None:
+            max_context_tokens = SETTINGS.llm_max_context_tokens
+        char_budget = max_context_tokens * _CHARS_PER_TOKEN
+        
         context_parts = []
+        used = 0
         for i, review in enumerate(reviews, 1):
-            context_parts.append(
-                f"Review {i}:\n"
-                f"Park: {review['branch']}\n"
-                f"Rating: {review['rating']}\n"
-                f"Date: {review['year_month']}\n"
-                f"Reviewer Location: {review['reviewer_location']}\n"
-                f"Review: {review['review_text']}\n"
+            part = f"Review {i}:\n" + _render_review(
+                review['branch'],
+                review['rating'],
+                review['year_month'],
+                review['reviewer_location'],
+                review['review_text']
             )
+            used += len(part)
+            if char_budget and context_parts and used > char_budget:
+                logger.debug("Context budget reached, using %s of %s reviews", len(context_parts), len(reviews))
+                break
+            context_parts.append(part)
             
-        return "\n---\n".join(context_parts)
+        return "\n---\n".join(context_parts), len(context_parts)
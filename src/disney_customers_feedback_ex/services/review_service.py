@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import heapq
+import importlib.util
 import logging
+import os
+import tempfile
+import threading
+from collections import Counter, defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
 from disney_customers_feedback_ex.core import metrics as app_metrics
@@ -12,6 +21,33 @@ from disney_customers_feedback_ex.services.vector_store import VectorStore
 
 logger = logging.getLogger(__name__)
 
+# Result field -> (source column, max length); values are pre-rendered as str
+_RESULT_FIELDS = {
+    'branch': ('Branch', None),
+    'rating': ('Rating', None),
+    'year_month': ('Year_Month', None),
+    'reviewer_location': ('Reviewer_Location', None),
+    'review_text': ('Review_Text', 500),  # Limit text length
+}
+
+# CSV columns kept in memory (the rest, e.g. Review_ID, are never read)
+_COLUMNS = frozenset(column for column, _ in _RESULT_FIELDS.values())
+
+# Characters dropped when normalizing branch/location names
+_NORMALIZE_TABLE = str.maketrans('', '', '_- ')
+
+# Embedded batches allowed to wait for (or be in) a ChromaDB write at once
+_INGEST_QUEUE_DEPTH = 2
+
+# Upper bound on memoized filter masks (one per distinct filter value)
+_MASK_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=8192)
+def _normalize_text_cached(text: str) -> str:
+    """Lowercase ``text`` and drop '_', '-' and ' ' (memoized; inputs repeat)."""
+    return text.lower().translate(_NORMALIZE_TABLE)
+
 
 class ReviewService:
     """Service for loading and querying Disney customer reviews."""
@@ -20,7 +56,8 @@ class ReviewService:
         self,
         data_path: Path,
         embedding_service: EmbeddingService | None = None,
-        vector_store: VectorStore | None = None
+        vector_store: VectorStore | None = None,
+        index_batch_size: int = 10_000
     ) -> None:
         """Initialize the review service with data.
         
@@ -28,12 +65,35 @@ class ReviewService:
             data_path: Path to the reviews CSV file.
             embedding_service: Optional embedding service for semantic search.
             vector_store: Optional vector store for semantic search.
+            index_batch_size: Reviews embedded per batch when indexing.
         """
         self.data_path = data_path
         self.reviews_df: pd.DataFrame | None = None
         self.embedding_service = embedding_service
         self.vector_store = vector_store
+        self.index_batch_size = index_batch_size
         self._embeddings_indexed = False
+        
+        # Column-wise views of the corpus built once at load time: lowercased
+        # review texts (variable-width StringDType, so substring search runs in
+        # NumPy's string ufuncs), plus branch/location codes into normalized
+        # value tables and the matching original values (as stored in the
+        # vector store metadata)
+        self._texts_lower: np.ndarray | None = None
+        self._branch_codes: np.ndarray | None = None
+        self._branch_values: list[str] = []
+        self._branch_labels: list[str] = []
+        self._location_codes: np.ndarray | None = None
+        self._location_values: list[str] = []
+        self._location_labels: list[str] = []
+        # (column, normalized filter value) -> row mask
+        self._mask_cache: dict[tuple[str, str], np.ndarray] = {}
+        # Result field -> per-row rendered values, in _RESULT_FIELDS order
+        self._result_columns: dict[str, np.ndarray] = {}
+        # Whitespace token -> sorted row positions containing it; built on the
+        # first hybrid search, since only keyword scoring there needs it
+        self._token_index: dict[str, np.ndarray] | None = None
+        self._token_index_lock = threading.Lock()
     
     def _normalize_text(self, text: str) -> str:
         """Normalize text by removing special characters and converting to lowercase.
@@ -44,26 +104,267 @@ class ReviewService:
         Returns:
             Normalized text.
         """
-        return text.lower().replace('_', '').replace('-', '').replace(' ', '')
+        return _normalize_text_cached(text)
         
     def load_reviews(self) -> None:
-        """Load reviews from CSV file into memory."""
-        logger.info(f"Loading reviews from {self.data_path}")
+        """Load reviews from CSV file into memory.
         
-        # Try different encodings to handle Unicode issues
+        When pyarrow is installed, the parsed reviews are also written to a
+        Parquet file next to the CSV, which later loads read instead for as
+        long as it is newer than the CSV.
+        """
+        parquet_path = self.data_path.with_suffix('.parquet')
+        if self._pyarrow_available() and self._is_fresh(parquet_path):
+            logger.info("Loading reviews from %s", parquet_path)
+            try:
+                self.reviews_df = pd.read_parquet(parquet_path)
+            except Exception as e:
+                # A corrupt or unreadable copy only costs a CSV parse
+                logger.warning("Could not read Parquet copy of reviews, parsing CSV: %s", e)
+            else:
+                logger.info("Loaded %s reviews from Parquet", len(self.reviews_df))
+                self._compact_columns()
+                self._build_corpus_arrays()
+                return
+        
+        logger.info("Loading reviews from %s", self.data_path)
+        
+        # Pick the first encoding that decodes the raw bytes (a fast, parse-free
+        # check), so the CSV itself is parsed exactly once
+        raw = self.data_path.read_bytes()
         encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
         
         for encoding in encodings:
             try:
-                self.reviews_df = pd.read_csv(self.data_path, encoding=encoding)
-                logger.info(f"Loaded {len(self.reviews_df)} reviews using {encoding} encoding")
-                return
+                raw.decode(encoding)
             except UnicodeDecodeError:
-                logger.debug(f"Failed to load with {encoding} encoding, trying next...")
+                logger.debug("File is not valid %s, trying next...", encoding)
                 continue
+            
+            del raw
+            self.reviews_df = pd.read_csv(
+                self.data_path,
+                encoding=encoding,
+                usecols=lambda column: column in _COLUMNS,
+                low_memory=False,
+                # The C parser reads UTF-8 straight from the mapped file
+                memory_map=encoding == 'utf-8'
+            )
+            logger.info("Loaded %s reviews using %s encoding", len(self.reviews_df), encoding)
+            self._compact_columns()
+            self._build_corpus_arrays()
+            self._write_parquet(parquet_path)
+            return
         
         # If all encodings fail, raise an error
         raise ValueError(f"Unable to read CSV file with any supported encoding")
+    
+    @staticmethod
+    def _pyarrow_available() -> bool:
+        """Check whether pyarrow (Parquet engine, Arrow string storage) is installed."""
+        return importlib.util.find_spec("pyarrow") is not None
+    
+    def _is_fresh(self, parquet_path: Path) -> bool:
+        """Check whether the Parquet copy exists and is newer than the CSV."""
+        try:
+            return parquet_path.stat().st_mtime >= self.data_path.stat().st_mtime
+        except OSError:
+            return False
+    
+    def _write_parquet(self, parquet_path: Path) -> None:
+        """Write the loaded reviews to Parquet for faster subsequent loads.
+        
+        The file is written under a temporary name in the same directory and
+        renamed into place, so concurrent loaders (e.g. other workers) never
+        see a partial file. Failures, such as a read-only install directory,
+        are logged and otherwise ignored.
+        """
+        if not self._pyarrow_available():
+            return
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                dir=parquet_path.parent, prefix=parquet_path.name + '.', suffix='.tmp'
+            )
+            os.close(fd)
+            self.reviews_df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, parquet_path)
+            tmp_path = None
+            logger.info("Wrote Parquet copy of reviews to %s", parquet_path)
+        except Exception as e:
+            logger.warning("Could not write Parquet copy of reviews: %s", e)
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+        
+    def _compact_columns(self) -> None:
+        """Store low-cardinality columns as categoricals and ratings as small ints.
+        
+        With pyarrow installed, review texts are also moved into Arrow string
+        buffers instead of one Python object per review.
+        """
+        df = self.reviews_df
+        for column in ('Branch', 'Year_Month', 'Reviewer_Location'):
+            if column in df:
+                df[column] = df[column].astype('category')
+        if 'Rating' in df:
+            df['Rating'] = pd.to_numeric(df['Rating'], downcast='integer')
+        if 'Review_Text' in df and self._pyarrow_available():
+            df['Review_Text'] = df['Review_Text'].astype('string[pyarrow]')
+    
+    def _build_corpus_arrays(self) -> None:
+        """Precompute the per-row arrays used by filtering and keyword search.
+        
+        Review rows are addressed by position, matching the default
+        ``RangeIndex`` of the loaded DataFrame.
+        """
+        df = self.reviews_df
+        self._texts_lower = df['Review_Text'].fillna('').astype(str).str.lower().to_numpy(
+            dtype=np.dtypes.StringDType()
+        )
+        self._branch_codes, self._branch_values, self._branch_labels = self._factorize_normalized(df['Branch'])
+        (
+            self._location_codes, self._location_values, self._location_labels
+        ) = self._factorize_normalized(df['Reviewer_Location'])
+        self._mask_cache.clear()
+        self._token_index = None
+        
+        self._result_columns = {}
+        for field, (column, max_length) in _RESULT_FIELDS.items():
+            if column in df:
+                values = df[column].astype(str)
+                if max_length is not None:
+                    values = values.str[:max_length]
+                self._result_columns[field] = values.to_numpy(dtype=object)
+            else:
+                self._result_columns[field] = np.full(len(df), '', dtype=object)
+    
+    def _records(self, positions: np.ndarray) -> list[dict[str, str]]:
+        """Build result dictionaries for the reviews at the given row positions.
+        
+        Args:
+            positions: Row positions, in result order.
+            
+        Returns:
+            List of review dictionaries.
+        """
+        fields = list(self._result_columns)
+        columns = [self._result_columns[field][positions] for field in fields]
+        return [dict(zip(fields, values)) for values in zip(*columns)]
+    
+    def _factorize_normalized(self, column: pd.Series) -> tuple[np.ndarray, list[str], list[str]]:
+        """Encode a categorical column as int32 codes into its normalized values.
+        
+        Args:
+            column: Column to encode.
+            
+        Returns:
+            Tuple of (codes, normalized unique values, original unique values).
+        """
+        # Missing values get code -1, which no filter value matches
+        codes, uniques = pd.factorize(column)
+        labels = [str(value) for value in uniques]
+        return codes.astype(np.int32), [self._normalize_text(label) for label in labels], labels
+    
+    def _code_mask(self, column: str, needle: str) -> np.ndarray:
+        """Get a row mask for the rows whose normalized ``column`` value contains ``needle``.
+        
+        Filter values repeat across queries, so masks are memoized; callers
+        must not modify the returned array.
+        
+        Args:
+            column: "branch" or "location".
+            needle: Normalized filter value.
+            
+        Returns:
+            Boolean mask over all rows.
+        """
+        key = (column, needle)
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            if column == "branch":
+                codes, values = self._branch_codes, self._branch_values
+            else:
+                codes, values = self._location_codes, self._location_values
+            matching = [code for code, value in enumerate(values) if needle in value]
+            mask = np.isin(codes, matching)
+            
+            if len(self._mask_cache) >= _MASK_CACHE_SIZE:
+                self._mask_cache.clear()
+            self._mask_cache[key] = mask
+        return mask
+    
+    def _metadata_where(self, branch: str | None = None, location: str | None = None) -> dict | None:
+        """Translate the branch and location filters into a vector store ``where`` clause.
+        
+        Filters match normalized substrings, so each becomes an ``$in`` over
+        the original values it matches.
+        
+        Args:
+            branch: Optional branch name to filter by.
+            location: Optional location to filter by.
+            
+        Returns:
+            ChromaDB metadata filter, or None when no filter is set.
+        """
+        clauses = []
+        if branch:
+            needle = self._normalize_text(branch)
+            clauses.append({"branch": {"$in": [
+                label for label, value in zip(self._branch_labels, self._branch_values) if needle in value
+            ]}})
+        if location:
+            needle = self._normalize_text(location)
+            clauses.append({"reviewer_location": {"$in": [
+                label for label, value in zip(self._location_labels, self._location_values) if needle in value
+            ]}})
+        
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+    
+    def _filter_positions(self, branch: str | None = None, location: str | None = None) -> np.ndarray:
+        """Get the row positions of reviews matching the branch and location filters.
+        
+        Args:
+            branch: Optional branch name to filter by.
+            location: Optional location to filter by.
+            
+        Returns:
+            Sorted array of row positions.
+        """
+        mask = self._filter_mask(branch, location)
+        if mask is None:
+            return np.arange(len(self._texts_lower))
+        return np.flatnonzero(mask)
+    
+    def _filter_mask(self, branch: str | None = None, location: str | None = None) -> np.ndarray | None:
+        """Get the row mask of reviews matching the branch and location filters.
+        
+        Args:
+            branch: Optional branch name to filter by.
+            location: Optional location to filter by.
+            
+        Returns:
+            Boolean mask over all rows (must not be modified), or None when
+            no filter is set.
+        """
+        if self.reviews_df is None:
+            raise ValueError("Reviews not loaded. Call load_reviews() first.")
+        
+        if branch and location:
+            return (
+                self._code_mask("branch", self._normalize_text(branch))
+                & self._code_mask("location", self._normalize_text(location))
+            )
+        if branch:
+            return self._code_mask("branch", self._normalize_text(branch))
+        if location:
+            return self._code_mask("location", self._normalize_text(location))
+        return None
         
     def index_embeddings(self) -> None:
         """Generate and index embeddings for all reviews."""
@@ -87,62 +388,64 @@ class ReviewService:
                 current_count = self.vector_store.collection.count()
                 
                 if current_count >= total_reviews:
-                    logger.info(f"Vector store already contains {current_count} documents (need {total_reviews}), skipping indexing")
+                    logger.info("Vector store already contains %s documents (need %s), skipping indexing", current_count, total_reviews)
                     self._embeddings_indexed = True
                     return
                 elif current_count > 0:
-                    logger.warning(f"Vector store contains {current_count} documents but need {total_reviews}. This may cause duplicate indexing. Consider clearing the collection first.")
+                    logger.warning("Vector store contains %s documents but need %s. This may cause duplicate indexing. Consider clearing the collection first.", current_count, total_reviews)
                     
             except Exception as e:
-                logger.info(f"Could not check existing documents: {e}, proceeding with indexing")
+                logger.info("Could not check existing documents: %s, proceeding with indexing", e)
             
-            # Use batch size of 3000 for embedding generation and ChromaDB
-            # This balances performance and memory usage
-            batch_size = 3000
+            batch_size = self.index_batch_size
+            batch_count = (total_reviews + batch_size - 1) // batch_size
             
-            logger.info(f"Processing {total_reviews} reviews in batches of {batch_size}")
+            logger.info("Processing %s reviews in batches of %s", total_reviews, batch_size)
             
-            for batch_start in range(0, total_reviews, batch_size):
-                batch_end = min(batch_start + batch_size, total_reviews)
-                batch_df = self.reviews_df.iloc[batch_start:batch_end]
-                
-                logger.info(f"Processing batch {batch_start//batch_size + 1}/{(total_reviews + batch_size - 1)//batch_size} (rows {batch_start}-{batch_end-1})")
-                
-                # Prepare batch data
-                batch_texts = batch_df['Review_Text'].fillna('No content').tolist()
-                batch_ids = [str(batch_start + i) for i in range(len(batch_texts))]
+            # Pipeline the two stages: while batches are written to ChromaDB by
+            # one background writer (in order), the next batch is embedded
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="chroma-ingest") as writer:
+                pending: deque[Future[None]] = deque()
                 
-                # Generate embeddings for this batch
-                logger.info(f"Generating embeddings for {len(batch_texts)} reviews...")
-                batch_embeddings = self.embedding_service.embed_batch(batch_texts)
-                
-                # Prepare metadata for this batch
-                batch_metadata = []
-                for _, row in batch_df.iterrows():
-                    batch_metadata.append({
-                        'branch': str(row.get('Branch', '')),
-                        'rating': str(row.get('Rating', '')),
-                        'year_month': str(row.get('Year_Month', '')),
-                        'reviewer_location': str(row.get('Reviewer_Location', '')),
-                        'review_text': str(row.get('Review_Text', ''))[:500]
-                    })
-                
-                # Add batch to vector store
-                logger.info(f"Adding batch to vector store...")
-                self.vector_store.add_reviews_batch(
-                    ids=batch_ids,
-                    reviews_data=batch_metadata,
-                    embeddings=batch_embeddings,
-                    documents=batch_texts
-                )
+                for batch_start in range(0, total_reviews, batch_size):
+                    batch_end = min(batch_start + batch_size, total_reviews)
+                    batch_number = batch_start // batch_size + 1
+                    
+                    logger.info("Processing batch %s/%s (rows %s-%s)", batch_number, batch_count, batch_start, batch_end - 1)
+                    
+                    # Prepare batch data
+                    batch_texts = self.reviews_df['Review_Text'].iloc[batch_start:batch_end].fillna('No content').tolist()
+                    batch_ids = list(map(str, range(batch_start, batch_end)))
+                    
+                    # Generate embeddings for this batch
+                    logger.info("Generating embeddings for %s reviews...", len(batch_texts))
+                    batch_embeddings = self.embedding_service.embed_batch(batch_texts)
+                    
+                    # Prepare metadata for this batch
+                    batch_metadata = self._records(np.arange(batch_start, batch_end))
+                    
+                    # Bound the backlog (re-raising any write error) so the
+                    # embedder can run ahead of slow writes, but not unboundedly
+                    while len(pending) >= _INGEST_QUEUE_DEPTH:
+                        pending.popleft().result()
+                    
+                    logger.info("Adding batch %s to vector store...", batch_number)
+                    pending.append(writer.submit(
+                        self.vector_store.add_reviews_batch,
+                        ids=batch_ids,
+                        reviews_data=batch_metadata,
+                        embeddings=batch_embeddings,
+                        documents=batch_texts
+                    ))
                 
-                logger.info(f"Successfully processed batch {batch_start//batch_size + 1}")
+                while pending:
+                    pending.popleft().result()
             
             self._embeddings_indexed = True
-            logger.info(f"Successfully indexed {total_reviews} review embeddings")
+            logger.info("Successfully indexed %s review embeddings", total_reviews)
             
         except Exception as e:
-            logger.error(f"Failed to index embeddings: {str(e)}. Continuing with keyword search only.")
+            logger.error("Failed to index embeddings: %s. Continuing with keyword search only.", e)
             # Don't re-raise, let the service continue with keyword search only
         
     def search_reviews(
@@ -163,39 +466,43 @@ class ReviewService:
         Returns:
             List of relevant review dictionaries.
         """
-        # Use the shared filtering method
-        df = self._apply_filters(branch, location)
-        
-        # Check if dataframe is empty after filtering
-        if df.empty:
-            logger.info(f"No reviews found matching filters for query: {query}")
+        # Nothing can be relevant to an empty query
+        if not query.strip():
+            logger.info("Empty query, skipping search")
             return []
         
-        # Simple text search in review text with metrics
+        if branch or location:
+            # Use the shared filtering method
+            positions = self._filter_positions(branch, location)
+            
+            # Check if nothing is left after filtering
+            if positions.size == 0:
+                logger.info("No reviews found matching filters for query: %s", query)
+                return []
+            texts = self._texts_lower[positions]
+        else:
+            # Unfiltered: score the whole corpus in place, without gathering a copy
+            if self.reviews_df is None:
+                raise ValueError("Reviews not loaded. Call load_reviews() first.")
+            positions = None
+            texts = self._texts_lower
+        
+        # Simple text search in the pre-lowercased review texts with metrics
         with app_metrics.measure_duration(
             app_metrics.keyword_search_duration,
             {"has_filters": str(branch is not None or location is not None)}
         ):
-            query_lower = query.lower()
-            df['relevance'] = df['Review_Text'].fillna('').str.lower().apply(
-                lambda x: sum(word in x for word in query_lower.split())
-            )
-        
-        # Sort by relevance and take top results
-        top_reviews = df.nlargest(max_results, 'relevance')
-        
-        # Convert to list of dicts
-        results = []
-        for _, row in top_reviews.iterrows():
-            results.append({
-                'branch': str(row.get('Branch', '')),
-                'rating': str(row.get('Rating', '')),
-                'year_month': str(row.get('Year_Month', '')),
-                'reviewer_location': str(row.get('Reviewer_Location', '')),
-                'review_text': str(row.get('Review_Text', ''))[:500]  # Limit text length
-            })
-            
-        logger.info(f"Found {len(results)} relevant reviews for query: {query}")
+            # One vectorized substring pass per distinct query word, weighted
+            # by how often the word appears in the query
+            relevance = np.zeros(texts.size, dtype=np.int64)
+            for word, count in Counter(query.lower().split()).items():
+                relevance += count * (np.strings.find(texts, word) >= 0)
+        
+        # Take the top results by relevance, ties in corpus order
+        top_order = self._top_k(relevance, max_results)
+        results = self._records(top_order if positions is None else positions[top_order])
+            
+        logger.info("Found %s relevant reviews for query: %s", len(results), query)
         return results
         
     def search_reviews_hybrid(
@@ -205,7 +512,8 @@ class ReviewService:
         location: str | None = None,
         max_results: int = 10,
         keyword_weight: float = 0.4,
-        semantic_weight: float = 0.6
+        semantic_weight: float = 0.6,
+        query_embedding: np.ndarray | list[float] | None = None
     ) -> list[dict[str, Any]]:
         """Search for relevant reviews using hybrid keyword + semantic search.
         
@@ -216,67 +524,74 @@ class ReviewService:
             max_results: Maximum number of results to return.
             keyword_weight: Weight for keyword search results.
             semantic_weight: Weight for semantic search results.
+            query_embedding: Precomputed embedding of the query, if available.
             
         Returns:
             List of relevant review dictionaries with combined scores.
         """
+        # Nothing can be relevant to an empty query
+        if not query.strip():
+            logger.info("Empty query, skipping search")
+            return []
+        
         # If vector search is not available, return keyword results only
         if self.embedding_service is None or self.vector_store is None or not self._embeddings_indexed:
             logger.info("Vector search not available, returning keyword results only")
             keyword_results = self.search_reviews(query, branch, location, max_results)
             return keyword_results
         
-        logger.info(f"Performing hybrid search for query: {query}")
+        logger.info("Performing hybrid search for query: %s", query)
         
-        # Step 1: Fast pandas filtering to get candidates
-        df = self._apply_filters(branch, location)
+        # Step 1: Fast filtering to get candidate row positions (no DataFrame copy)
+        positions = self._filter_positions(branch, location)
         
-        if df.empty:
+        if positions.size == 0:
             logger.info("No reviews match the filters")
             return []
         
-        logger.info(f"Pandas filtering found {len(df)} candidate reviews")
+        logger.info("Filtering found %s candidate reviews", positions.size)
         
         # Step 2: Keyword relevance scoring on candidates
-        keyword_scores = self._calculate_keyword_scores(df, query)
+        keyword_scores = self._calculate_keyword_scores(positions, query)
         
         # Step 3: Semantic search strategy based on candidate count
         semantic_scores = {}
         
         try:
-            # Generate query embedding once
-            with app_metrics.measure_duration(
-                app_metrics.embedding_generation_duration,
-                {"operation": "query_embedding"}
-            ):
-                query_embedding = self.embedding_service.embed_text(query)
+            # Generate query embedding once, unless the caller already did
+            if query_embedding is None:
+                with app_metrics.measure_duration(
+                    app_metrics.embedding_generation_duration,
+                    {"operation": "query_embedding"}
+                ):
+                    query_embedding = self.embedding_service.embed_query(query)
             
             # Decision: Use ID filtering if we have enough candidates to still get good results
             # We need at least 5x max_results candidates to ensure diversity after semantic filtering
             min_candidates_threshold = max_results * 5
             
-            if len(df) >= min_candidates_threshold:
-                # Strategy A: Search with ID filtering (more efficient)
-                logger.info(f"Using ID-filtered search with {len(df)} candidates (>= {min_candidates_threshold} threshold)")
-                app_metrics.record_hybrid_strategy("id_filtered", len(df))
+            if positions.size >= min_candidates_threshold:
+                # Strategy A: Search with the filters pushed down to ChromaDB
+                # (the "id_filtered" metric label is kept for existing dashboards)
+                logger.info("Using metadata-filtered search with %s candidates (>= %s threshold)", positions.size, min_candidates_threshold)
+                app_metrics.record_hybrid_strategy("id_filtered", positions.size)
                 
-                candidate_ids = [str(idx) for idx in df.index]
-                
-                # Use ChromaDB's ids parameter to search within specific IDs
+                # Use ChromaDB's where clause on the branch/location metadata
+                # instead of shipping every candidate ID with the query
                 with app_metrics.measure_duration(
                     app_metrics.chromadb_search_duration,
                     {"strategy": "id_filtered"}
                 ):
                     semantic_results = self.vector_store.search_similar(
                         query_embedding=query_embedding,
-                        n_results=min(len(candidate_ids), max_results * 2),
-                        ids=candidate_ids
+                        n_results=min(positions.size, max_results * 2),
+                        where_filter=self._metadata_where(branch, location)
                     )
                 
             else:
                 # Strategy B: Full search without ID filtering (better coverage)
-                logger.info(f"Using full search without ID filtering (only {len(df)} candidates < {min_candidates_threshold} threshold)")
-                app_metrics.record_hybrid_strategy("full_search", len(df))
+                logger.info("Using full search without ID filtering (only %s candidates < %s threshold)", positions.size, min_candidates_threshold)
+                app_metrics.record_hybrid_strategy("full_search", positions.size)
                 
                 with app_metrics.measure_duration(
                     app_metrics.chromadb_search_duration,
@@ -287,11 +602,13 @@ class ReviewService:
                         n_results=max_results * 3  # Get more to allow for filtering
                     )
                 
-                # Post-filter to only include reviews that match our pandas filters
-                candidate_indices = set(df.index)
+                # Post-filter to only include reviews that match our filters,
+                # testing each hit against the memoized row mask
+                mask = self._filter_mask(branch, location)
+                row_count = len(self._texts_lower)
                 semantic_results = [
-                    result for result in semantic_results 
-                    if int(result['id']) in candidate_indices
+                    result for result in semantic_results
+                    if 0 <= (doc_id := int(result['id'])) < row_count and (mask is None or mask[doc_id])
                 ]
             
             # Convert semantic results to scores
@@ -299,10 +616,10 @@ class ReviewService:
                 doc_id = int(result['id'])
                 semantic_scores[doc_id] = result['similarity_score']
             
-            logger.info(f"Semantic search found {len(semantic_scores)} scored reviews")
+            logger.info("Semantic search found %s scored reviews", len(semantic_scores))
             
         except Exception as e:
-            logger.warning(f"Semantic search failed: {str(e)}, using keyword-only results")
+            logger.warning("Semantic search failed: %s, using keyword-only results", e)
         
         # Step 4: Combine scores
         final_scores = {}
@@ -324,83 +641,98 @@ class ReviewService:
                 final_scores[doc_id] = semantic_weight * sem_score
         
         # Step 5: Get top results
-        top_indices = sorted(final_scores.keys(), key=lambda x: final_scores[x], reverse=True)[:max_results]
+        top_indices = heapq.nlargest(max_results, final_scores, key=final_scores.__getitem__)
         
         # Step 6: Format results
-        results = []
-        for idx in top_indices:
-            row = df.loc[idx]
-            results.append({
-                'branch': str(row.get('Branch', '')),
-                'rating': str(row.get('Rating', '')),
-                'year_month': str(row.get('Year_Month', '')),
-                'reviewer_location': str(row.get('Reviewer_Location', '')),
-                'review_text': str(row.get('Review_Text', ''))[:500],
-                'keyword_score': keyword_scores.get(idx, 0.0),
-                'semantic_score': semantic_scores.get(idx, 0.0),
-                'combined_score': final_scores[idx]
-            })
-        
-        logger.info(f"Returning {len(results)} hybrid search results")
+        results = self._records(np.array(top_indices, dtype=np.intp))
+        for result, idx in zip(results, top_indices):
+            result['keyword_score'] = keyword_scores.get(idx, 0.0)
+            result['semantic_score'] = semantic_scores.get(idx, 0.0)
+            result['combined_score'] = final_scores[idx]
+        
+        logger.info("Returning %s hybrid search results", len(results))
         return results
     
-    def _apply_filters(self, branch: str | None = None, location: str | None = None) -> pd.DataFrame:
-        """Apply branch and location filters to the reviews DataFrame.
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Get the positions of the ``k`` highest scores, best first.
+        
+        Ties are broken by position, as a stable descending sort would, but
+        only the selected ``k`` entries are sorted.
         
         Args:
-            branch: Optional branch name to filter by.
-            location: Optional location to filter by.
+            scores: Non-negative integer scores.
+            k: Number of positions to return.
             
         Returns:
-            Filtered DataFrame.
+            Array of at most ``k`` positions into ``scores``.
         """
-        if self.reviews_df is None:
-            raise ValueError("Reviews not loaded. Call load_reviews() first.")
-            
-        df = self.reviews_df.copy()
-        
-        if branch:
-            # Normalize both the filter value and the column values for comparison
-            branch_normalized = self._normalize_text(branch)
-            mask = df['Branch'].fillna('').astype(str).apply(self._normalize_text).str.contains(
-                branch_normalized, case=False, na=False
-            )
-            df = df[mask]
+        size = scores.size
+        if k >= size:
+            return np.argsort(-scores, kind='stable')
+        
+        # Fold the tie-break into a unique key: earlier positions rank higher
+        keys = scores * size + np.arange(size - 1, -1, -1)
+        top = np.argpartition(-keys, k - 1)[:k]
+        return top[np.argsort(-keys[top])]
+    
+    def build_keyword_index(self) -> None:
+        """Build the inverted keyword index that hybrid search scores with.
         
-        if location:
-            # Normalize both the filter value and the column values for comparison
-            location_normalized = self._normalize_text(location)
-            mask = df['Reviewer_Location'].fillna('').astype(str).apply(self._normalize_text).str.contains(
-                location_normalized, case=False, na=False
-            )
-            df = df[mask]
-            
-        return df
+        Call at startup, so the first hybrid query doesn't pay for the build
+        (and concurrent first queries don't wait on it); otherwise the index
+        is built on first use.
+        """
+        self._get_token_index()
     
-    def _calculate_keyword_scores(self, df: pd.DataFrame, query: str) -> dict[int, float]:
-        """Calculate keyword relevance scores for the given DataFrame."""
-        query_words = set(query.lower().split())
-        scores = {}
-        
-        for idx, row in df.iterrows():
-            review_text = str(row.get('Review_Text', '')).lower()
-            review_words = set(review_text.split())
-            
-            # Calculate word overlap
-            common_words = query_words.intersection(review_words)
-            if len(query_words) > 0:
-                overlap_score = len(common_words) / len(query_words)
-            else:
-                overlap_score = 0.0
-            
-            # Boost for exact phrase matches
-            phrase_boost = 1.0
-            if query.lower() in review_text:
-                phrase_boost = 1.5
-            
-            scores[idx] = overlap_score * phrase_boost
+    def _get_token_index(self) -> dict[str, np.ndarray]:
+        """Get the inverted index of whitespace tokens, building it on first use.
         
-        return scores
+        Returns:
+            Mapping of token to the row positions whose text contains it.
+        """
+        if self._token_index is None:
+            with self._token_index_lock:
+                if self._token_index is None:
+                    postings: defaultdict[str, list[int]] = defaultdict(list)
+                    for position, text in enumerate(self._texts_lower):
+                        for token in set(text.split()):
+                            postings[token].append(position)
+                    self._token_index = {
+                        token: np.array(rows, dtype=np.intp) for token, rows in postings.items()
+                    }
+                    logger.info("Built keyword index with %s tokens", len(self._token_index))
+        return self._token_index
+    
+    def _calculate_keyword_scores(self, positions: np.ndarray, query: str) -> dict[int, float]:
+        """Calculate keyword relevance scores for the reviews at the given row positions."""
+        query_lower = query.lower()
+        query_words = set(query_lower.split())
+        # Positions are sorted and unique, so covering every row means no
+        # filter was applied; use the match counts as-is instead of gathering
+        unfiltered = positions.size == len(self._texts_lower)
+        
+        # Calculate word overlap: count matched query words per row from the
+        # inverted index, touching only rows that contain some query word
+        if query_words:
+            token_index = self._get_token_index()
+            matched = np.zeros(len(self._texts_lower), dtype=np.int32)
+            for word in query_words:
+                rows = token_index.get(word)
+                if rows is not None:
+                    matched[rows] += 1
+            scores = (matched if unfiltered else matched[positions]) / len(query_words)
+        else:
+            scores = np.zeros(positions.size)
+        
+        # Boost for exact phrase matches; a boost only changes non-zero scores,
+        # so only rows sharing a word with the query are searched for the phrase
+        hits = np.flatnonzero(scores)
+        if hits.size:
+            has_phrase = np.strings.find(self._texts_lower[positions[hits]], query_lower) >= 0
+            scores[hits[has_phrase]] *= 1.5
+        
+        return dict(zip(positions.tolist(), scores.tolist()))
     
     def _combine_search_results(
         self,
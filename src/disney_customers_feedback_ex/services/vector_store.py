@@ -1,13 +1,53 @@
 from __future__ import annotations
 
+import hashlib
 import logging
-from typing import Any
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
 
-import chromadb
-from chromadb.config import Settings
+import numpy as np
+
+if TYPE_CHECKING:
+    import chromadb
 
 logger = logging.getLogger(__name__)
 
+# Seconds a computed get_collection_stats() result is reused
+_STATS_TTL_SECONDS = 60.0
+
+# Seconds a collection.peek() sample is reused
+_PEEK_TTL_SECONDS = 30.0
+
+# Recent search_similar() results kept for identical queries, and for how long
+_SEARCH_CACHE_SIZE = 256
+_SEARCH_CACHE_TTL_SECONDS = 600.0
+
+# Filtered searches matching at most this many rows are answered by exact
+# cosine search over those rows instead of the HNSW index
+_PREFILTER_MAX_CANDIDATES = 2000
+
+# Filters whose matching rows (unit embeddings, documents, metadata) are kept
+# locally for exact search; reused for the search cache's TTL. At most about
+# 3 MB each at 384 dimensions
+_CANDIDATE_CACHE_SIZE = 16
+
+# (ids, unit-length embedding rows, documents, metadatas) of a filter's matches
+_Candidates = tuple[list[str], np.ndarray, list[str], list[dict[str, Any]]]
+
+
+def _truncate_document(document: str, max_length: int = 200) -> str:
+    """Shorten a document for display, marking truncation with "..."."""
+    return document if len(document) <= max_length else document[:max_length] + "..."
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row of a float32 array (zero rows stay zero)."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
 
 class VectorStore:
     """Service for storing and querying vectors using ChromaDB."""
@@ -21,12 +61,34 @@ class VectorStore:
         """
         self.host = host
         self.port = port
-        self.client: chromadb.HttpClient | None = None
+        self.client: chromadb.ClientAPI | None = None
         self.collection: chromadb.Collection | None = None
+        # Largest add() the server accepts, fetched on first use
+        self._max_batch_size: int | None = None
+        # (monotonic expiry time, stats) of the last get_collection_stats()
+        self._stats_cache: tuple[float, dict[str, Any]] | None = None
+        # peek() limit -> (monotonic expiry time, sample)
+        self._peek_cache: dict[int, tuple[float, dict[str, Any]]] = {}
+        # Query key -> (monotonic expiry time, results), in LRU order; cleared
+        # (with the caches above) whenever this process changes the collection
+        self._search_cache: OrderedDict[tuple, tuple[float, list[dict[str, Any]]]] = OrderedDict()
+        self._search_cache_lock = threading.Lock()
+        # repr() of where filters found to match too many rows to prefilter
+        self._broad_filters: set[str] = set()
+        # repr() of where filter -> (monotonic expiry time, its matching rows),
+        # in LRU order; guarded by the search cache lock
+        self._candidate_cache: OrderedDict[str, tuple[float, _Candidates]] = OrderedDict()
         
     def connect(self) -> None:
         """Connect to ChromaDB server."""
-        logger.info(f"Connecting to ChromaDB at {self.host}:{self.port}")
+        # Deferred so importing this module doesn't load the chromadb client
+        import chromadb
+        from chromadb.config import Settings
+        
+        logger.info("Connecting to ChromaDB at %s:%s", self.host, self.port)
+        # The client keeps one persistent httpx session whose default pool
+        # (100 connections, idle ones kept alive) already covers concurrent
+        # searches from worker threads; chromadb's Settings has no pool options
         self.client = chromadb.HttpClient(
             host=self.host,
             port=self.port,
@@ -46,20 +108,32 @@ class VectorStore:
         try:
             # Try to get existing collection
             self.collection = self.client.get_collection(name)
-            logger.info(f"Retrieved existing collection: {name}")
+            logger.info("Retrieved existing collection: %s", name)
         except Exception:
             # Create new collection if it doesn't exist
+            # HNSW settings are fixed at creation: inner-product distance over
+            # the unit-length vectors stored here (so search_similar's
+            # 1 - distance is the cosine similarity, without per-comparison
+            # normalization on the server), a denser
+            # graph built with a wider beam for recall, and a search beam wide
+            # enough for the ~30 neighbours hybrid search asks for
             self.collection = self.client.create_collection(
                 name=name,
-                metadata={"description": "Disney customer reviews with embeddings"}
+                metadata={
+                    "description": "Disney customer reviews with embeddings",
+                    "hnsw:space": "ip",
+                    "hnsw:M": 32,
+                    "hnsw:construction_ef": 200,
+                    "hnsw:search_ef": 64
+                }
             )
-            logger.info(f"Created new collection: {name}")
+            logger.info("Created new collection: %s", name)
             
     def add_reviews_batch(
         self,
         ids: list[str],
         reviews_data: list[dict[str, str]],
-        embeddings: list[list[float]],
+        embeddings: np.ndarray | list[list[float]],
         documents: list[str]
     ) -> None:
         """Add a batch of reviews with embeddings to the vector store.
@@ -67,58 +141,104 @@ class VectorStore:
         Args:
             ids: List of unique IDs for the reviews.
             reviews_data: List of review metadata dictionaries.
-            embeddings: List of embedding vectors.
+            embeddings: Embedding vectors, one row per review.
             documents: List of review text documents.
         """
         if self.collection is None:
             raise ValueError("Collection not created. Call create_collection() first.")
             
         try:
-            logger.info(f"Adding batch of {len(ids)} reviews to ChromaDB")
+            n = len(ids)
+            logger.info("Adding batch of %d reviews to ChromaDB", n)
             
             # Ensure all lists have the same length
-            if not (len(ids) == len(reviews_data) == len(embeddings) == len(documents)):
+            if not (n == len(reviews_data) == len(embeddings) == len(documents)):
                 raise ValueError("All input lists must have the same length")
             
-            # ChromaDB add method
-            self.collection.add(
-                ids=ids,
-                documents=documents,
-                metadatas=reviews_data,
-                embeddings=embeddings
-            )
-            
-            logger.info(f"Successfully added {len(ids)} reviews to vector store")
+            # A float32 array lets the client send embeddings base64-encoded
+            # instead of as JSON float lists (smaller payload, faster parsing);
+            # unit-length rows make inner product equal cosine similarity
+            embeddings = _unit_rows(np.asarray(embeddings, dtype=np.float32))
+            
+            # ChromaDB add method, split to the server's maximum batch size
+            step = self._get_max_batch_size() or n
+            for start in range(0, n, step):
+                end = start + step
+                self.collection.add(
+                    ids=ids[start:end],
+                    documents=documents[start:end],
+                    metadatas=reviews_data[start:end],
+                    embeddings=embeddings[start:end]
+                )
+            
+            logger.info("Successfully added %d reviews to vector store", n)
+            self._clear_caches()
             
         except Exception as e:
-            logger.error(f"Error adding batch to vector store: {str(e)}")
+            logger.error("Error adding batch to vector store: %s", e)
             raise
 
+    def _get_max_batch_size(self) -> int | None:
+        """Get the largest batch the ChromaDB server accepts in one add().
+        
+        Returns:
+            Maximum batch size, or None if the server doesn't report one.
+        """
+        if self._max_batch_size is None:
+            try:
+                self._max_batch_size = self.client.get_max_batch_size()
+            except Exception as e:
+                logger.debug("Could not get ChromaDB max batch size: %s", e)
+                return None
+        return self._max_batch_size
+
     def add_reviews(
         self,
         reviews: list[dict[str, Any]],
-        embeddings: list[list[float]]
+        embeddings: np.ndarray | list[list[float]],
+        batch_size: int = 1024,
+        max_workers: int = 4
     ) -> None:
         """Add reviews with embeddings to the collection.
         
+        Reviews are sent in chunks of ``batch_size``, several in flight at
+        once, so each chunk's request payload is built only when it is about
+        to be sent.
+        
         Args:
             reviews: List of review dictionaries.
-            embeddings: List of embedding vectors.
+            embeddings: Embedding vectors, one row per review.
+            batch_size: Reviews per add request.
+            max_workers: Maximum number of concurrent add requests.
         """
-        # Generate IDs and documents from reviews_data
-        ids = [f"review_{i}" for i in range(len(reviews))]
-        documents = [review.get('review_text', '') for review in reviews]
+        embeddings = np.asarray(embeddings, dtype=np.float32)
         
-        self.add_reviews_batch(
-            ids=ids,
-            reviews_data=reviews,
-            embeddings=embeddings,
-            documents=documents
-        )
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chroma-add") as pool:
+            pending: deque[Future[None]] = deque()
+            for start in range(0, len(reviews), batch_size):
+                end = min(start + batch_size, len(reviews))
+                chunk = reviews[start:end]
+                
+                # Bound the chunks in flight (re-raising any error)
+                while len(pending) >= max_workers:
+                    pending.popleft().result()
+                
+                # Generate IDs (row positions, as index_embeddings uses) and
+                # documents from reviews_data
+                pending.append(pool.submit(
+                    self.add_reviews_batch,
+                    ids=list(map(str, range(start, end))),
+                    reviews_data=chunk,
+                    embeddings=embeddings[start:end],
+                    documents=[review.get('review_text', '') for review in chunk]
+                ))
+            
+            while pending:
+                pending.popleft().result()
         
     def search_similar(
         self,
-        query_embedding: list[float],
+        query_embedding: np.ndarray | list[float],
         n_results: int = 10,
         where_filter: dict | None = None,
         ids: list[str] | None = None
@@ -138,9 +258,34 @@ class VectorStore:
             if not self.collection:
                 raise ValueError("Collection not initialized")
             
+            query_row = _unit_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))
+            
+            # Identical searches (same vector, size and filter) are answered
+            # from the local cache; ID-restricted searches are not cached
+            cache_key = None
+            if not ids:
+                cache_key = (
+                    hashlib.blake2b(query_row.tobytes(), digest_size=16).digest(),
+                    n_results,
+                    repr(where_filter)
+                )
+                cached = self._get_cached_search(cache_key)
+                if cached is not None:
+                    return cached
+            
+            # Selective filters skip the index: brute-force the few matches
+            formatted_results = None
+            if where_filter and not ids:
+                formatted_results = self._search_prefiltered(query_row[0], n_results, where_filter)
+            if formatted_results is not None:
+                if cache_key is not None:
+                    self._cache_search(cache_key, formatted_results)
+                return formatted_results
+            
             # Build query parameters
             query_params = {
-                "query_embeddings": [query_embedding],
+                # One (1, D) float32 row rather than a list of Python floats
+                "query_embeddings": query_row,
                 "n_results": n_results,
                 "include": ["metadatas", "documents", "distances"]
             }
@@ -156,21 +301,177 @@ class VectorStore:
             results = self.collection.query(**query_params)
             
             # Transform results to our expected format
-            formatted_results = []
-            for i in range(len(results['ids'][0])):
-                similarity_score = 1.0 - results['distances'][0][i]  # Convert distance to similarity
-                formatted_results.append({
-                    'id': results['ids'][0][i],
-                    'review_text': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
+            result_ids = results['ids'][0]
+            # Convert distances to similarities in one array operation
+            similarities = (1.0 - np.asarray(results['distances'][0], dtype=np.float64)).tolist()
+            formatted_results = [
+                {
+                    'id': result_id,
+                    'review_text': document,
+                    'metadata': metadata,
                     'similarity_score': similarity_score
-                })
-            
+                }
+                for result_id, document, metadata, similarity_score in zip(
+                    result_ids,
+                    results['documents'][0],
+                    results['metadatas'][0],
+                    similarities
+                )
+            ]
+            
+            if cache_key is not None:
+                self._cache_search(cache_key, formatted_results)
             return formatted_results
             
         except Exception as e:
-            logger.error(f"Error searching similar documents: {str(e)}")
+            logger.error("Error searching similar documents: %s", e)
+            return []
+    
+    def _search_prefiltered(
+        self,
+        query: np.ndarray,
+        n_results: int,
+        where_filter: dict
+    ) -> list[dict[str, Any]] | None:
+        """Exact cosine search over the rows matching a selective filter.
+        
+        The matching rows are fetched once per filter and kept locally (see
+        ``_filter_candidates``), so repeated searches with the same filter
+        make no server round trip.
+        
+        Args:
+            query: Unit-length query embedding.
+            n_results: Maximum number of results to return.
+            where_filter: Metadata filter.
+            
+        Returns:
+            Formatted results, or None, leaving the search to the index, when
+            the collection uses neither cosine nor inner-product distance or
+            the filter matches more than _PREFILTER_MAX_CANDIDATES rows.
+        """
+        filter_key = repr(where_filter)
+        if filter_key in self._broad_filters:
+            return None
+        if (self.collection.metadata or {}).get("hnsw:space") not in ("cosine", "ip"):
+            return None
+        if n_results <= 0:
             return []
+        
+        candidates = self._filter_candidates(filter_key, where_filter)
+        if candidates is None:
+            return None
+        ids, vectors, documents, metadatas = candidates
+        if not ids:
+            return []
+        
+        # Rows and query are unit length, so the dot product is the cosine
+        similarities = vectors @ query
+        k = min(n_results, len(ids))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        return [
+            {
+                'id': ids[i],
+                'review_text': documents[i],
+                'metadata': metadatas[i],
+                'similarity_score': float(similarities[i])
+            }
+            for i in top.tolist()
+        ]
+    
+    def _filter_candidates(self, filter_key: str, where_filter: dict) -> _Candidates | None:
+        """Get the rows matching a filter, from the local cache or the server.
+        
+        Args:
+            filter_key: ``repr()`` of the filter.
+            where_filter: Metadata filter.
+            
+        Returns:
+            The matching rows, or None if there are too many to search exactly
+            (remembered in ``_broad_filters``).
+        """
+        now = time.monotonic()
+        with self._search_cache_lock:
+            entry = self._candidate_cache.get(filter_key)
+            if entry is not None and entry[0] > now:
+                self._candidate_cache.move_to_end(filter_key)
+                return entry[1]
+        
+        # An ID-only probe keeps broad filters cheap to rule out
+        candidate_ids = self.collection.get(
+            where=where_filter,
+            include=[],
+            limit=_PREFILTER_MAX_CANDIDATES + 1
+        )['ids']
+        if len(candidate_ids) > _PREFILTER_MAX_CANDIDATES:
+            self._broad_filters.add(filter_key)
+            return None
+        
+        if candidate_ids:
+            fetched = self.collection.get(
+                ids=candidate_ids,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            candidates = (
+                list(fetched['ids']),
+                _unit_rows(np.asarray(fetched['embeddings'], dtype=np.float32)),
+                list(fetched['documents']),
+                list(fetched['metadatas'])
+            )
+        else:
+            candidates = ([], np.empty((0, 0), dtype=np.float32), [], [])
+        
+        with self._search_cache_lock:
+            self._candidate_cache[filter_key] = (now + _SEARCH_CACHE_TTL_SECONDS, candidates)
+            self._candidate_cache.move_to_end(filter_key)
+            while len(self._candidate_cache) > _CANDIDATE_CACHE_SIZE:
+                self._candidate_cache.popitem(last=False)
+        return candidates
+    
+    def _get_cached_search(self, key: tuple) -> list[dict[str, Any]] | None:
+        """Get unexpired cached results for a search, marking them recently used."""
+        with self._search_cache_lock:
+            entry = self._search_cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._search_cache[key]
+                return None
+            self._search_cache.move_to_end(key)
+            return list(entry[1])
+    
+    def _cache_search(self, key: tuple, results: list[dict[str, Any]]) -> None:
+        """Cache the results of a search."""
+        with self._search_cache_lock:
+            self._search_cache[key] = (time.monotonic() + _SEARCH_CACHE_TTL_SECONDS, list(results))
+            self._search_cache.move_to_end(key)
+            while len(self._search_cache) > _SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+    
+    def _peek(self, limit: int) -> dict[str, Any]:
+        """Get the first documents of the collection, reusing recent samples.
+        
+        Args:
+            limit: Number of documents to retrieve.
+            
+        Returns:
+            The ``collection.peek`` result.
+        """
+        entry = self._peek_cache.get(limit)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        sample = self.collection.peek(limit=limit)
+        self._peek_cache[limit] = (time.monotonic() + _PEEK_TTL_SECONDS, sample)
+        return sample
+    
+    def _clear_caches(self) -> None:
+        """Drop cached samples, stats, search results and filter candidates."""
+        self._peek_cache.clear()
+        self._stats_cache = None
+        self._broad_filters.clear()
+        with self._search_cache_lock:
+            self._search_cache.clear()
+            self._candidate_cache.clear()
     
     def get_collection_stats(self) -> dict[str, Any]:
         """Get detailed statistics about the collection.
@@ -180,27 +481,26 @@ class VectorStore:
         """
         if self.collection is None:
             return {"error": "Collection not initialized"}
+        
+        if self._stats_cache is not None and self._stats_cache[0] > time.monotonic():
+            return self._stats_cache[1]
             
         try:
             count = self.collection.count()
             
             # Get sample of documents to see data structure
-            sample_data = self.collection.peek(limit=5)
+            sample_data = self._peek(5)
             
-            # Get unique values for key metadata fields
-            all_metadata = self.collection.get(include=['metadatas'])['metadatas']
+            # Get unique values for key metadata fields from a sample of the
+            # first 100 documents (only that sample is fetched)
+            sample_metadata = self.collection.get(include=['metadatas'], limit=100)['metadatas']
             
-            branches = set()
-            locations = set()
-            ratings = set()
+            metas = [meta for meta in sample_metadata if meta]
+            branches = {meta.get('branch', 'N/A') for meta in metas}
+            locations = {meta.get('reviewer_location', 'N/A') for meta in metas}
+            ratings = {meta.get('rating', 'N/A') for meta in metas}
             
-            for meta in all_metadata[:100]:  # Sample first 100 for performance
-                if meta:
-                    branches.add(meta.get('branch', 'N/A'))
-                    locations.add(meta.get('reviewer_location', 'N/A'))
-                    ratings.add(meta.get('rating', 'N/A'))
-            
-            return {
+            stats = {
                 "total_documents": count,
                 "sample_ids": sample_data.get('ids', [])[:5],
                 "sample_metadata": sample_data.get('metadatas', [])[:3],
@@ -209,6 +509,8 @@ class VectorStore:
                 "unique_ratings": sorted(list(ratings)),
                 "collection_name": "disney_reviews"
             }
+            self._stats_cache = (time.monotonic() + _STATS_TTL_SECONDS, stats)
+            return stats
             
         except Exception as e:
             return {"error": f"Failed to get stats: {str(e)}"}
@@ -235,35 +537,38 @@ class VectorStore:
             return []
             
         try:
-            # Build where clause
-            where_clause = {}
+            # Build where clause; ChromaDB takes one field per clause, so
+            # several conditions are combined with $and
+            conditions = []
             if branch:
-                where_clause["branch"] = {"$eq": branch}
+                conditions.append({"branch": {"$eq": branch}})
             if location:
-                where_clause["reviewer_location"] = {"$eq": location}
+                conditions.append({"reviewer_location": {"$eq": location}})
             if rating:
-                where_clause["rating"] = {"$eq": rating}
+                conditions.append({"rating": {"$eq": rating}})
+            
+            if not conditions:
+                where_clause = None
+            elif len(conditions) == 1:
+                where_clause = conditions[0]
+            else:
+                where_clause = {"$and": conditions}
             
+            # IDs are always returned, so they are not listed in include
             results = self.collection.get(
-                where=where_clause if where_clause else None,
+                where=where_clause,
                 limit=limit,
-                include=['documents', 'metadatas', 'ids']
+                include=['documents', 'metadatas']
             )
             
             # Format results
-            formatted_results = []
-            if results['ids']:
-                for i in range(len(results['ids'])):
-                    formatted_results.append({
-                        'id': results['ids'][i],
-                        'document': results['documents'][i][:200] + "..." if len(results['documents'][i]) > 200 else results['documents'][i],
-                        'metadata': results['metadatas'][i]
-                    })
-            
-            return formatted_results
+            return [
+                {'id': doc_id, 'document': _truncate_document(document), 'metadata': metadata}
+                for doc_id, document, metadata in zip(results['ids'], results['documents'], results['metadatas'])
+            ]
             
         except Exception as e:
-            logger.error(f"Error searching by metadata: {str(e)}")
+            logger.error("Error searching by metadata: %s", e)
             return []
     
     def get_sample_documents(self, limit: int = 5) -> list[dict[str, Any]]:
@@ -279,21 +584,17 @@ class VectorStore:
             return []
             
         try:
-            results = self.collection.peek(limit=limit)
+            results = self._peek(limit)
             
-            formatted_results = []
-            if results['ids']:
-                for i in range(len(results['ids'])):
-                    formatted_results.append({
-                        'id': results['ids'][i],
-                        'document': results['documents'][i][:200] + "..." if len(results['documents'][i]) > 200 else results['documents'][i],
-                        'metadata': results['metadatas'][i] if results['metadatas'] else {}
-                    })
-            
-            return formatted_results
+            ids = results['ids']
+            metadatas = results['metadatas'] or [{}] * len(ids)
+            return [
+                {'id': doc_id, 'document': _truncate_document(document), 'metadata': metadata}
+                for doc_id, document, metadata in zip(ids, results['documents'], metadatas)
+            ]
             
         except Exception as e:
-            logger.error(f"Error getting sample documents: {str(e)}")
+            logger.error("Error getting sample documents: %s", e)
             return []
 
     def reset_collection(self) -> None:
@@ -306,6 +607,7 @@ class VectorStore:
             logger.info("Collection deleted")
         except Exception:
             logger.info("Collection didn't exist, nothing to delete")
-            
+        
+        self._clear_caches()
         self.create_collection()
         logger.info("Collection reset successfully")
\ No newline at end of file
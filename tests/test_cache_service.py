@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import hashlib
+from types import SimpleNamespace
+from typing import Any
+
+import numpy as np
+import pytest
+
+from disney_customers_feedback_ex.services import cache_service
+from disney_customers_feedback_ex.services.cache_service import QueryCacheService
+
+
+class _FakeRedis:
+    """In-memory stand-in for the subset of the Redis client the cache uses.
+
+    Instances share their data through ``store``, so several services built on
+    the same store behave like workers talking to one Redis server.
+    """
+
+    def __init__(self, store: SimpleNamespace) -> None:
+        self.store = store
+        self.connection_pool = SimpleNamespace(connection_kwargs={"host": "fake", "port": 0})
+
+    def ping(self) -> bool:
+        return True
+
+    def setex(self, key: bytes, ttl: int, value: bytes) -> None:
+        self.store.values[key] = value
+
+    def get(self, key: bytes) -> bytes | None:
+        return self.store.values.get(key)
+
+    def mget(self, keys: list[bytes]) -> list[bytes | None]:
+        return [self.store.values.get(key) for key in keys]
+
+    def incr(self, key: str) -> int:
+        value = int(self.store.values.get(key, 0)) + 1
+        self.store.values[key] = str(value).encode()
+        return value
+
+    def exists(self, *keys: bytes) -> int:
+        return sum(key in self.store.values for key in keys)
+
+    def delete(self, *keys: Any) -> int:
+        deleted = 0
+        for key in keys:
+            if self.store.values.pop(key, None) is not None or self.store.sets.pop(key, None) is not None:
+                deleted += 1
+        return deleted
+
+    def sadd(self, name: str, *members: bytes) -> int:
+        members_set = self.store.sets.setdefault(name, set())
+        before = len(members_set)
+        members_set.update(members)
+        return len(members_set) - before
+
+    def srem(self, name: str, *members: bytes) -> int:
+        members_set = self.store.sets.get(name, set())
+        before = len(members_set)
+        members_set.difference_update(members)
+        return before - len(members_set)
+
+    def scard(self, name: str) -> int:
+        return len(self.store.sets.get(name, ()))
+
+    def sscan(self, name: str, cursor: int = 0, count: int = 10) -> tuple[int, list[bytes]]:
+        members = sorted(self.store.sets.get(name, ()))
+        page = members[cursor:cursor + count]
+        next_cursor = cursor + count if cursor + count < len(members) else 0
+        return next_cursor, page
+
+    def info(self, section: str | None = None) -> dict[str, str]:
+        return {"used_memory_human": "1K"}
+
+
+class _NoEmbeddings:
+    """Embedding service for tests that always pass precomputed embeddings."""
+
+    def embed_query(self, text: str) -> np.ndarray:
+        raise AssertionError("embeddings are passed explicitly in these tests")
+
+
+@pytest.fixture
+def store() -> SimpleNamespace:
+    """Shared backing data for fake Redis clients."""
+    return SimpleNamespace(values={}, sets={})
+
+
+@pytest.fixture
+def make_service(store: SimpleNamespace, monkeypatch: pytest.MonkeyPatch):
+    """Build cache services (one per simulated worker) on the shared fake Redis."""
+    monkeypatch.setattr(cache_service.redis, "Redis", lambda **_: _FakeRedis(store))
+    # Small pages so syncing goes through several SSCAN/MGET round trips
+    monkeypatch.setattr(cache_service, "_SCAN_PAGE_SIZE", 2)
+    return lambda: QueryCacheService(_NoEmbeddings())
+
+
+def _vector(*values: float) -> np.ndarray:
+    return np.asarray(values, dtype=np.float32)
+
+
+def _identifier(question: str) -> bytes:
+    """Get the cache identifier the service derives from a question."""
+    return hashlib.sha256(question.encode()).hexdigest()[:16].encode()
+
+
+def test_set_then_get_hits(make_service) -> None:
+    """Test that a stored question is found again by its embedding."""
+    service = make_service()
+    service.set("What about the rides?", "They are fun.", 3, query_embedding=_vector(1, 0, 0, 0))
+
+    result = service.get("What about the rides?", query_embedding=_vector(1, 0, 0, 0))
+
+    assert result is not None
+    assert result["cached"] is True
+    assert result["answer"] == "They are fun."
+    assert result["num_reviews_used"] == 3
+
+
+def test_dissimilar_question_misses(make_service) -> None:
+    """Test that a question below the similarity threshold is a miss."""
+    service = make_service()
+    service.set("What about the rides?", "They are fun.", 3, query_embedding=_vector(1, 0, 0, 0))
+
+    assert service.get("How is the food?", query_embedding=_vector(0, 1, 0, 0)) is None
+
+
+def test_index_syncs_entries_from_other_workers(make_service) -> None:
+    """Test that entries written elsewhere are picked up across SSCAN pages."""
+    reader = make_service()
+    writer = make_service()
+    for i in range(5):
+        embedding = np.zeros(5, dtype=np.float32)
+        embedding[i] = 1.0
+        writer.set(f"question {i}", f"answer {i}", 1, query_embedding=embedding)
+
+    result = reader.get("question 3", query_embedding=_vector(0, 0, 0, 1, 0))
+
+    assert result is not None
+    assert result["answer"] == "answer 3"
+    assert reader._index_size == 5
+
+
+def test_clear_empties_index(make_service) -> None:
+    """Test that clear() drops every entry from Redis and the local index."""
+    service = make_service()
+    service.set("What about the rides?", "They are fun.", 3, query_embedding=_vector(1, 0, 0, 0))
+
+    service.clear()
+
+    assert service.get("What about the rides?", query_embedding=_vector(1, 0, 0, 0)) is None
+    assert service._index_size == 0
+    assert service.size() == 0
+
+
+def test_index_drops_entries_cleared_by_other_workers(make_service) -> None:
+    """Test that rows removed from Redis elsewhere are compacted out of the index."""
+    reader = make_service()
+    writer = make_service()
+    writer.set("old 1", "stale", 1, query_embedding=_vector(1, 0, 0))
+    writer.set("old 2", "stale", 1, query_embedding=_vector(0, 1, 0))
+    assert reader.get("old 1", query_embedding=_vector(1, 0, 0)) is not None
+
+    writer.clear()
+    writer.set("new", "fresh", 2, query_embedding=_vector(0, 0, 1))
+
+    assert reader.get("old 1", query_embedding=_vector(1, 0, 0)) is None
+    assert reader._index_size == 1
+    result = reader.get("new", query_embedding=_vector(0, 0, 1))
+    assert result is not None
+    assert result["answer"] == "fresh"
+
+
+def test_index_resyncs_when_entry_count_is_unchanged(make_service) -> None:
+    """Test that replaced entries are picked up even if the key set size matches."""
+    reader = make_service()
+    writer = make_service()
+    writer.set("old", "stale", 1, query_embedding=_vector(1, 0, 0))
+    assert reader.get("old", query_embedding=_vector(1, 0, 0)) is not None
+
+    writer.clear()
+    writer.set("new", "fresh", 2, query_embedding=_vector(0, 0, 1))
+
+    # Same number of entries as before, but a different one
+    result = reader.get("new", query_embedding=_vector(0, 0, 1))
+    assert result is not None
+    assert result["answer"] == "fresh"
+    assert reader.get("old", query_embedding=_vector(1, 0, 0)) is None
+
+
+def test_own_writes_skip_resync(make_service, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a worker's own write keeps its index current without a sync."""
+    service = make_service()
+    service.set("first", "one", 1, query_embedding=_vector(1, 0, 0))
+    assert service.get("first", query_embedding=_vector(1, 0, 0)) is not None
+
+    def fail_sync(generation: int) -> None:
+        raise AssertionError("index should already be current")
+
+    monkeypatch.setattr(service, "_sync_index", fail_sync)
+    service.set("second", "two", 1, query_embedding=_vector(0, 1, 0))
+
+    result = service.get("second", query_embedding=_vector(0, 1, 0))
+    assert result is not None
+    assert result["answer"] == "two"
+
+
+def test_expired_best_match_is_evicted(make_service, store: SimpleNamespace) -> None:
+    """Test that an expired entry can't shadow a live match."""
+    service = make_service()
+    service.set("live", "live answer", 1, query_embedding=_vector(1, 0, 0, 0))
+    service.set("expired", "expired answer", 1, query_embedding=_vector(1, 0.1, 0, 0))
+    expired = _identifier("expired")
+
+    # Expire the closer entry's answer and embedding, as Redis TTLs would
+    del store.values[service._get_cache_key(expired)]
+    del store.values[service._get_embedding_key(expired)]
+
+    result = service.get("expired", query_embedding=_vector(1, 0.1, 0, 0))
+
+    assert result is not None
+    assert result["answer"] == "live answer"
+    assert expired not in service._index_positions
+    assert service.size() == 1
+    assert service.redis_client.scard(service.all_keys_set) == 1
+
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from disney_customers_feedback_ex.core import circuit_breaker
+from disney_customers_feedback_ex.core.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+)
+
+
+class _Clock:
+    """Controllable stand-in for ``time.monotonic_ns``."""
+
+    def __init__(self) -> None:
+        self.now_ns = 1_000_000_000
+
+    def __call__(self) -> int:
+        return self.now_ns
+
+    def advance(self, seconds: float) -> None:
+        self.now_ns += int(seconds * 1e9)
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> _Clock:
+    """Replace the breaker's monotonic clock with a manually advanced one."""
+    fake = _Clock()
+    monkeypatch.setattr(circuit_breaker, "_monotonic_ns", fake)
+    return fake
+
+
+def _succeed() -> str:
+    return "ok"
+
+
+def _fail() -> None:
+    raise RuntimeError("service down")
+
+
+def _record(breaker: CircuitBreaker, outcomes: str) -> None:
+    """Run one call per character: "s" succeeds, "f" fails."""
+    for outcome in outcomes:
+        if outcome == "s":
+            breaker.call(_succeed)
+        else:
+            with pytest.raises(RuntimeError):
+                breaker.call(_fail)
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    """Fail calls until the breaker opens."""
+    while breaker.state is not CircuitState.OPEN:
+        _record(breaker, "f")
+
+
+def test_window_keeps_only_recent_outcomes(clock: _Clock) -> None:
+    """Test that outcomes older than the window size roll out of the counts."""
+    breaker = CircuitBreaker("test", failure_threshold=0.5, window_size=4, minimum_throughput=4)
+
+    _record(breaker, "fsss")
+    assert breaker.get_state()["failures"] == 1
+    assert breaker.get_state()["successes"] == 3
+
+    # The first failure rolls out as the fifth outcome is pushed in
+    _record(breaker, "s")
+    state = breaker.get_state()
+    assert state["failures"] == 0
+    assert state["successes"] == 4
+
+    _record(breaker, "f")
+    state = breaker.get_state()
+    assert state["failures"] == 1
+    assert state["successes"] == 3
+    assert state["failure_rate"] == 0.25
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_failure_rate_ignored_below_minimum_throughput(clock: _Clock) -> None:
+    """Test that the circuit stays closed until enough calls were recorded."""
+    breaker = CircuitBreaker("test", failure_threshold=0.5, window_size=10, minimum_throughput=5)
+
+    _record(breaker, "ffff")
+    assert breaker.state is CircuitState.CLOSED
+
+    _record(breaker, "f")
+    assert breaker.state is CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(_succeed)
+
+
+def test_open_circuit_rejects_until_timeout(clock: _Clock) -> None:
+    """Test that an open circuit only lets a probe through after the timeout."""
+    breaker = CircuitBreaker("test", timeout=30.0, window_size=4, minimum_throughput=2)
+    _open(breaker)
+
+    clock.advance(29.0)
+    with pytest.raises(CircuitOpenError):
+        breaker.call(_succeed)
+
+    clock.advance(1.0)
+    assert breaker.call(_succeed) == "ok"
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_half_open_allows_single_probe(clock: _Clock) -> None:
+    """Test that other calls are rejected while the HALF_OPEN probe runs."""
+    breaker = CircuitBreaker("test", timeout=30.0, window_size=4, minimum_throughput=2)
+    _open(breaker)
+    clock.advance(30.0)
+
+    rejected = []
+
+    def probe() -> str:
+        assert breaker.state is CircuitState.HALF_OPEN
+        try:
+            breaker.call(_succeed)
+        except CircuitOpenError:
+            rejected.append(True)
+        return "recovered"
+
+    assert breaker.call(probe) == "recovered"
+    assert rejected == [True]
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_failed_probe_reopens_circuit(clock: _Clock) -> None:
+    """Test that a failing HALF_OPEN probe opens the circuit again."""
+    breaker = CircuitBreaker("test", timeout=30.0, window_size=4, minimum_throughput=2)
+    _open(breaker)
+    clock.advance(30.0)
+
+    _record(breaker, "f")
+    assert breaker.state is CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(_succeed)
+
+
+def test_interrupted_probe_releases_slot(clock: _Clock) -> None:
+    """Test that a probe ended by a BaseException doesn't block later probes."""
+    breaker = CircuitBreaker("test", timeout=30.0, window_size=4, minimum_throughput=2)
+    _open(breaker)
+    clock.advance(30.0)
+
+    def interrupted() -> None:
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        breaker.call(interrupted)
+
+    assert breaker.call(_succeed) == "ok"
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_state_reports_wall_clock_time_of_last_change(clock: _Clock) -> None:
+    """Test that last_state_change is an epoch timestamp."""
+    breaker = CircuitBreaker("test", window_size=4, minimum_throughput=2)
+    _open(breaker)
+
+    state = breaker.get_state()
+    assert state["state"] == "open"
+    assert abs(state["last_state_change"] - time.time()) < 60
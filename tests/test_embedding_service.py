@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from disney_customers_feedback_ex.services.embedding_service import EmbeddingService
+
+
+def test_stop_batching_fails_in_flight_batch() -> None:
+    """Test that queries being encoded when the batcher stops don't hang."""
+    service = EmbeddingService(max_batch_delay=0.0)
+    encoding = threading.Event()
+    release = threading.Event()
+
+    def slow_encode(texts: list[str]) -> np.ndarray:
+        encoding.set()
+        release.wait(5)
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+    service._encode = slow_encode
+
+    async def run() -> None:
+        service.start_batching()
+        query = asyncio.create_task(service.embed_query_async("Are the rides fun?"))
+        await asyncio.to_thread(encoding.wait, 5)
+
+        await service.stop_batching()
+        release.set()
+
+        with pytest.raises(RuntimeError, match="shutting down"):
+            await asyncio.wait_for(query, 1)
+
+    asyncio.run(run())
@@ -8,6 +8,21 @@ import time
 BASE_URL = "http://localhost:8000"
 
 
+def _wait_for_cache_entries(minimum: int, timeout: float = 10.0) -> None:
+    """Wait until the cache holds at least ``minimum`` entries.
+    
+    Answers are written to the cache in a background task after the response
+    is sent, so they become visible to lookups shortly afterwards.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = httpx.get(f"{BASE_URL}/cache/stats", timeout=10.0).json()
+        if stats.get("total_entries", 0) >= minimum:
+            return
+        time.sleep(0.1)
+    pytest.fail(f"Cache did not reach {minimum} entries within {timeout}s")
+
+
 def test_root_endpoint() -> None:
     """Test the root endpoint returns welcome message."""
     response = httpx.get(f"{BASE_URL}/")
@@ -134,6 +149,7 @@ def test_cache_functionality() -> None:
     assert response1.status_code == 200
     data1 = response1.json()
     assert data1["cached"] is False
+    _wait_for_cache_entries(1)
     
     # Second query - exact same question, should be cached
     response2 = httpx.post(
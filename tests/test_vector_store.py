@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import Any
+
+import chromadb
+import pytest
+from chromadb.config import Settings
+
+from disney_customers_feedback_ex.services.vector_store import VectorStore
+
+
+def test_connect_builds_valid_client_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that connect() passes settings chromadb accepts to HttpClient."""
+    captured: dict[str, Any] = {}
+
+    def http_client(**kwargs: Any) -> object:
+        captured.update(kwargs)
+        return object()
+
+    monkeypatch.setattr(chromadb, "HttpClient", http_client)
+    store = VectorStore(host="chroma", port=1234)
+
+    store.connect()
+
+    assert captured["host"] == "chroma"
+    assert captured["port"] == 1234
+    assert isinstance(captured["settings"], Settings)
+    assert captured["settings"].allow_reset is True
+    assert store.client is not None
+
+
+class _FakeCollection:
+    """Collection stand-in serving one filter's rows and counting server calls."""
+
+    metadata = {"hnsw:space": "ip"}
+
+    def __init__(self, embeddings: list[list[float]]) -> None:
+        self.ids = [str(i) for i in range(len(embeddings))]
+        self.embeddings = embeddings
+        self.get_calls = 0
+
+    def get(self, ids: list[str] | None = None, **kwargs: Any) -> dict[str, Any]:
+        self.get_calls += 1
+        selected = ids if ids is not None else self.ids
+        rows = [self.ids.index(i) for i in selected]
+        return {
+            "ids": list(selected),
+            "embeddings": [self.embeddings[row] for row in rows],
+            "documents": [f"review {row}" for row in rows],
+            "metadatas": [{"branch": "Disneyland_HongKong"} for _ in rows],
+        }
+
+    def query(self, **kwargs: Any) -> dict[str, Any]:
+        raise AssertionError("selective filters should not reach the index")
+
+
+def test_selective_filter_searches_cached_candidates() -> None:
+    """Test that a filter's rows are fetched once and then searched locally."""
+    store = VectorStore()
+    collection = _FakeCollection([[1.0, 0.0], [0.0, 2.0], [0.6, 0.8]])
+    store.collection = collection
+    where = {"branch": {"$in": ["Disneyland_HongKong"]}}
+
+    first = store.search_similar([0.0, 1.0], n_results=2, where_filter=where)
+    second = store.search_similar([1.0, 0.0], n_results=1, where_filter=where)
+
+    assert [result["id"] for result in first] == ["1", "2"]
+    assert first[0]["similarity_score"] == pytest.approx(1.0)
+    assert [result["id"] for result in second] == ["0"]
+    # One ID probe and one row fetch, then purely local
+    assert collection.get_calls == 2
+
+    store._clear_caches()
+    store.search_similar([0.6, 0.8], n_results=1, where_filter=where)
+    assert collection.get_calls == 4